@@ -0,0 +1,101 @@
+"""
+Game server load test
+
+Starts the server on a free localhost port, opens a number of connections that each start a game and then sit idle,
+and plays full games on a few of them while the rest stay connected. Reports the request latency and the server's
+memory use per session.
+
+    python -m benchmarks.serverload [--idle 10000] [--active 100] [--difficulty HARD]
+
+Each connection is a file descriptor on both ends, so the open file limit (ulimit -n) has to allow twice --idle.
+"""
+import argparse
+import asyncio
+import json
+import random
+import resource
+import statistics
+import sys
+import time
+
+from server.gameserver import GameServer
+
+
+async def _request(reader, writer, request: dict) -> tuple:
+    """Sends one request, returning (reply, seconds taken)"""
+    started = time.perf_counter()
+    writer.write(json.dumps(request).encode() + b'\n')
+    reply = json.loads(await reader.readline())
+    return reply, time.perf_counter() - started
+
+
+async def _play(port: int, difficulty: str, games: int, rng: random.Random, latencies: list):
+    """Plays random moves against the AI for a few games"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    reply, seconds = await _request(reader, writer, {'type': 'new', 'difficulty': difficulty})
+    latencies.append(seconds)
+    for _ in range(games):
+        while reply['result'] is None:
+            cell = rng.choice([position for position, token in enumerate(reply['cells']) if token == ''])
+            reply, seconds = await _request(reader, writer, {'type': 'move', 'cell': cell})
+            latencies.append(seconds)
+        reply, seconds = await _request(reader, writer, {'type': 'reset'})
+        latencies.append(seconds)
+    writer.close()
+    await writer.wait_closed()
+
+
+async def run(idle: int, active: int, games: int, difficulty: str, seed: int = 0) -> dict:
+    server = GameServer(port=0, workers=1)
+    await server.start()
+    memory_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    connections = []
+    for _ in range(idle):
+        reader, writer = await asyncio.open_connection('127.0.0.1', server.port)
+        await _request(reader, writer, {'type': 'new', 'difficulty': difficulty})
+        connections.append(writer)
+    sessions = server.sessions
+    # ru_maxrss is in kilobytes on Linux; the clients live in this process too, so this is an upper bound
+    memory_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    latencies = []
+    started = time.perf_counter()
+    rng = random.Random(seed)
+    await asyncio.gather(*(_play(server.port, difficulty, games, random.Random(rng.random()), latencies)
+                           for _ in range(active)))
+    elapsed = time.perf_counter() - started
+
+    for writer in connections:
+        writer.close()
+    # let every handler see its connection close before shutting down
+    while server.sessions:
+        await asyncio.sleep(0.01)
+    await server.close()
+
+    latencies.sort()
+    return {
+        'sessions': sessions,
+        'kb_per_session': (memory_after - memory_before) / max(sessions, 1),
+        'requests': len(latencies),
+        'requests_per_second': len(latencies) / elapsed,
+        'median_ms': statistics.median(latencies) * 1000,
+        'p99_ms': latencies[int(len(latencies) * 0.99)] * 1000,
+    }
+
+
+def main(args: list = None) -> int:
+    parser = argparse.ArgumentParser(description='Load tests the game server on localhost')
+    parser.add_argument('--idle', type=int, default=10000, help='connections that start a game and wait')
+    parser.add_argument('--active', type=int, default=100, help='connections playing games')
+    parser.add_argument('--games', type=int, default=10, help='games per active connection')
+    parser.add_argument('--difficulty', default='HARD')
+    options = parser.parse_args(args)
+
+    result = asyncio.run(run(options.idle, options.active, options.games, options.difficulty))
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""
+Session store memory check
+
+Parks a number of random in-progress games in a SessionStore and reports the memory they take, along with the time
+to pack and unpack one.
+
+    python -m benchmarks.sessionstore [--games 1000000] [--size CLASSIC]
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+from constants.boardsize import BoardSize
+from constants.difficulty import Difficulty
+from constants.playertoken import PlayerToken
+from engine.gameengine import GameEngine
+from engine.sessionstore import SessionStore
+
+
+def _positions(size: BoardSize, count: int, rng: random.Random) -> list:
+    """Gets a few distinct unfinished games to cycle through"""
+    engines = []
+    while len(engines) < count:
+        engine = GameEngine(rng.choice(list(PlayerToken)), *size.value)
+        for _ in range(rng.randrange(engine.board.cells)):
+            if engine.apply_move(rng.choice(engine.legal_moves())) is not None:
+                break
+        if engine.result is None:
+            engines.append(engine)
+    return engines
+
+
+def run(games: int, size: BoardSize, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    engines = _positions(size, 1000, rng)
+    difficulties = list(Difficulty) + [None]
+
+    tracemalloc.start()
+    store = SessionStore()
+    started = time.perf_counter()
+    for game in range(games):
+        store.add(engines[game % len(engines)], difficulties[game % len(difficulties)])
+    add_seconds = time.perf_counter() - started
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    for slot in range(0, games, max(games // 10000, 1)):
+        store.load(slot)
+    load_seconds = (time.perf_counter() - started) / len(range(0, games, max(games // 10000, 1)))
+
+    return {
+        'games': len(store),
+        'mb': memory / 1e6,
+        'bytes_per_game': memory / games,
+        'add_us': add_seconds / games * 1e6,
+        'load_us': load_seconds * 1e6,
+    }
+
+
+def main(args: list = None) -> int:
+    parser = argparse.ArgumentParser(description='Measures the memory taken by parked games')
+    parser.add_argument('--games', type=int, default=1000000)
+    parser.add_argument('--size', default=BoardSize.CLASSIC.name, choices=[size.name for size in BoardSize])
+    options = parser.parse_args(args)
+
+    print(json.dumps(run(options.games, BoardSize[options.size]), indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
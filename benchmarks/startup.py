@@ -0,0 +1,72 @@
+"""
+Startup time benchmark
+
+Times importing the rules and the AIs in a fresh interpreter (so nothing is cached in sys.modules) and checks that
+doing so never pulls in Kivy, and that HardAI's module and table stay unloaded until HARD is picked.
+
+    python -m benchmarks.startup [--runs 10] [--max-ms 150]
+
+Exits with a non-zero status if the median import time goes over the limit or a lazy module was loaded.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# what the headless tools import, and the modules that must not come along with it
+HEADLESS_IMPORTS = ['engine.gameengine', 'players.ai.registry', 'players.ai.easy', 'players.ai.normal']
+LAZY_MODULES = ['kivy', 'players.ai.hard', 'players.ai.openingbook', 'players.ai.perfectplay', 'players.ai.search']
+
+_PROBE = '''
+import json, sys, time
+started = time.perf_counter()
+for name in {imports!r}:
+    __import__(name)
+elapsed = time.perf_counter() - started
+print(json.dumps({{'seconds': elapsed, 'loaded': [name for name in {lazy!r} if name in sys.modules]}}))
+'''
+
+
+def measure(runs: int = 10) -> dict:
+    """Imports the headless modules in `runs` fresh interpreters, returning the timings and any lazy module loaded"""
+    code = _PROBE.format(imports=HEADLESS_IMPORTS, lazy=LAZY_MODULES)
+    timings = []
+    loaded = set()
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True, capture_output=True, text=True)
+        probe = json.loads(output.stdout)
+        timings.append(probe['seconds'])
+        loaded.update(probe['loaded'])
+    return {
+        'median_ms': statistics.median(timings) * 1000,
+        'max_ms': max(timings) * 1000,
+        'runs': runs,
+        'unexpected_modules': sorted(loaded),
+    }
+
+
+def main(args: list = None) -> int:
+    parser = argparse.ArgumentParser(description='Times importing the rules and AIs without Kivy')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--max-ms', type=float, default=150.0, help='limit for the median import time')
+    options = parser.parse_args(args)
+
+    result = measure(options.runs)
+    print(json.dumps(result, indent=2))
+
+    failed = False
+    if result['median_ms'] > options.max_ms:
+        print('Headless import took {:.1f}ms (limit {:.1f}ms)'.format(result['median_ms'], options.max_ms))
+        failed = True
+    if result['unexpected_modules']:
+        print('Loaded modules that should stay lazy: ' + ', '.join(result['unexpected_modules']))
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
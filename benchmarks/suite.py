@@ -0,0 +1,379 @@
+"""
+Benchmark suite for the rules, the AIs and full games
+
+Every benchmark runs with fixed seeds on the headless engine and reports seconds per operation: the median of
+several samples, each a batch of calls long enough (MIN_SAMPLE_SECONDS) for timer and scheduler noise not to matter.
+Results are written as JSON and compared against a stored baseline, failing when a benchmark gets slower than its
+threshold allows. The sub-microsecond benchmarks vary the most between runs, so they get a looser default threshold.
+
+A shared VM can run a good deal slower for a second or so at a time, which would otherwise read as a regression of
+whatever ran then, so the whole suite is run several times over and each benchmark's median kept. The garbage
+collector is off while a sample runs, like timeit does, since when it kicks in depends on everything run before.
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --threshold 0.25 --threshold-for games.hard_vs_hard=0.5
+    python -m benchmarks.suite --update-baseline
+
+Timings depend on the machine, so regenerate the baseline when moving the suite to new hardware.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+
+from constants.playertoken import PlayerToken
+from engine.gameengine import GameEngine, play
+from players.ai.registry import load_engine
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+SEED = 1234
+
+# allowed slowdown over the baseline, 0.25 = 25% slower
+DEFAULT_THRESHOLD = 0.25
+# for the benchmarks timing a single call of well under a microsecond
+TINY_THRESHOLD = 0.5
+
+# shortest time a sample's batch of calls runs for, and the number of passes over the whole suite
+MIN_SAMPLE_SECONDS = 0.01
+DEFAULT_ROUNDS = 5
+
+# name -> function(quick) returning seconds per operation, and name -> default threshold where it isn't the usual one
+BENCHMARKS = {}
+THRESHOLDS = {}
+
+
+def benchmark(name: str, threshold: float = None):
+    """Registers a benchmark under the given name, with its own default threshold if given"""
+    def register(func):
+        BENCHMARKS[name] = func
+        if threshold is not None:
+            THRESHOLDS[name] = threshold
+        return func
+    return register
+
+
+def measure(func, number: int, repeat: int = 5) -> float:
+    """Median time per call of func over `repeat` samples
+
+    Each sample is a batch of `number` calls, doubled until it takes at least MIN_SAMPLE_SECONDS (so it stays a
+    multiple of `number`, and corpus benchmarks still visit every position equally often)
+    """
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        while True:
+            started = time.perf_counter()
+            for _ in range(number):
+                func()
+            if time.perf_counter() - started >= MIN_SAMPLE_SECONDS:
+                break
+            number *= 2
+
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for _ in range(number):
+                func()
+            samples.append((time.perf_counter() - started) / number)
+    finally:
+        if collecting:
+            gc.enable()
+    return statistics.median(samples)
+
+
+def build_corpus(count: int = 200, seed: int = SEED, rows: int = 3, cols: int = 3, win_length: int = 3) -> list:
+    """Move sequences leading to representative (unfinished) positions, from the opening to the endgame"""
+    rng = random.Random(seed)
+    corpus = []
+    engine = GameEngine(PlayerToken.X, rows, cols, win_length)
+    while len(corpus) < count:
+        engine.reset()
+        moves = []
+        plies = rng.randrange(0, engine.board.cells - 1)
+        for _ in range(plies):
+            move = rng.choice(sorted(engine.legal_moves()))
+            engine.apply_move(move)
+            moves.append(move)
+            if engine.result is not None:
+                break
+        if engine.result is None:
+            corpus.append(moves)
+    return corpus
+
+
+def replay(moves: list, rows: int = 3, cols: int = 3, win_length: int = 3) -> GameEngine:
+    """Sets up an engine in the position reached by the given moves"""
+    engine = GameEngine(PlayerToken.X, rows, cols, win_length)
+    for move in moves:
+        engine.apply_move(move)
+    return engine
+
+
+def _iterate(items: list):
+    """Returns a function that steps through the items, one per call"""
+    position = [0]
+
+    def step():
+        item = items[position[0] % len(items)]
+        position[0] += 1
+        return item
+    return step
+
+
+@benchmark('rules.play_full_game')
+def bench_play_full_game(quick: bool) -> float:
+    """Plays a fixed drawn game move by move: every move runs the win and draw checks"""
+    engine = GameEngine()
+    moves = [4, 0, 2, 6, 3, 5, 1, 7, 8]
+
+    def run():
+        engine.reset()
+        for move in moves:
+            engine.apply_move(move)
+    return measure(run, 2000 if quick else 20000)
+
+
+@benchmark('rules.place_and_undo')
+def bench_place_and_undo(quick: bool) -> float:
+    """Places and takes back a mark on a mid-game 15x15 board (incremental line counters)"""
+    engine = replay([112, 113, 97, 98, 127, 128], 15, 15, 5)
+    board = engine.board
+
+    def run():
+        board.place(142, PlayerToken.X)
+        board.remove(142, PlayerToken.X)
+    return measure(run, 5000 if quick else 50000)
+
+
+@benchmark('rules.end_checks', TINY_THRESHOLD)
+def bench_end_checks(quick: bool) -> float:
+    """Reads the win and draw state of corpus positions"""
+    boards = [replay(moves).board for moves in build_corpus()]
+    next_board = _iterate(boards)
+
+    def run():
+        board = next_board()
+        board.winner()
+        board.is_full()
+    return measure(run, 5000 if quick else 50000)
+
+
+@benchmark('ai.get_completing_target', TINY_THRESHOLD)
+def bench_completing_target(quick: bool) -> float:
+    """Looks for a winning and a blocking cell in corpus positions"""
+    engine = GameEngine()
+    ai = load_engine('normal')(engine, PlayerToken.X)
+    boards = [replay(moves).board for moves in build_corpus()]
+    next_board = _iterate(boards)
+
+    def run():
+        engine.board = next_board()
+        ai.get_completing_target(PlayerToken.X)
+        ai.get_completing_target(PlayerToken.O)
+    return measure(run, 2000 if quick else 20000)
+
+
+@benchmark('ai.analysis.analyze')
+def bench_analyze(quick: bool) -> float:
+    """Scores every empty cell of corpus positions, without the evaluator's cache"""
+    from players.ai.analysis import Evaluator
+    evaluator = Evaluator()
+    engines = [replay(moves) for moves in build_corpus()]
+    next_engine = _iterate(engines)
+
+    def run():
+        engine = next_engine()
+        evaluator.clear()
+        evaluator.analyze(engine.board, engine.current_player)
+    return measure(run, 1000 if quick else 10000)
+
+
+def _bench_choose_target(name: str, quick: bool, rows: int = 3, cols: int = 3, win_length: int = 3,
+                         count: int = 200, **options) -> float:
+    """Times an AI picking a move for the side to move across the corpus"""
+    random.seed(SEED)
+    engines = [replay(moves, rows, cols, win_length)
+               for moves in build_corpus(count, SEED, rows, cols, win_length)]
+    players = [load_engine(name)(engine, engine.current_player, **options) for engine in engines]
+    next_player = _iterate(players)
+    return measure(lambda: next_player().choose_target(), len(players) if quick else 5 * len(players))
+
+
+@benchmark('ai.easy.choose_target', TINY_THRESHOLD)
+def bench_easy(quick: bool) -> float:
+    return _bench_choose_target('easy', quick)
+
+
+@benchmark('ai.normal.choose_target', TINY_THRESHOLD)
+def bench_normal(quick: bool) -> float:
+    return _bench_choose_target('normal', quick)
+
+
+@benchmark('ai.hard.choose_target')
+def bench_hard(quick: bool) -> float:
+    return _bench_choose_target('hard', quick)
+
+
+@benchmark('ai.search.choose_target_5x5_depth3')
+def bench_search(quick: bool) -> float:
+    """Fixed-depth search on 5x5, 4 in a row (a deadline would make the timing meaningless)
+
+    Every move gets a fresh engine, otherwise the repeats would only measure transposition table hits
+    """
+    search = load_engine('search')
+    engines = [replay(moves, 5, 5, 4) for moves in build_corpus(20 if quick else 50, SEED, 5, 5, 4)]
+    next_engine = _iterate(engines)
+
+    def run():
+        engine = next_engine()
+        search(engine, engine.current_player, time_budget=60.0, max_depth=3).choose_target()
+    return measure(run, len(engines), 3)
+
+
+@benchmark('ai.mcts.choose_target_5x5_500')
+def bench_mcts(quick: bool) -> float:
+    """Fixed playout count on 5x5, 4 in a row, with a fresh engine (and tree) for every move"""
+    random.seed(SEED)
+    mcts = load_engine('mcts')
+    engines = [replay(moves, 5, 5, 4) for moves in build_corpus(10 if quick else 30, SEED, 5, 5, 4)]
+    next_engine = _iterate(engines)
+
+    def run():
+        engine = next_engine()
+        mcts(engine, engine.current_player, playouts=500, time_budget=None).choose_target()
+    return measure(run, len(engines), 3)
+
+
+def _bench_games(x: str, o: str, quick: bool) -> float:
+    """Seconds per full game between the given engines"""
+    random.seed(SEED)
+    engine = GameEngine()
+    x_player = load_engine(x)(engine, PlayerToken.X)
+    o_player = load_engine(o)(engine, PlayerToken.O)
+
+    def run():
+        engine.reset()
+        play(engine, x_player, o_player)
+    return measure(run, 200 if quick else 2000)
+
+
+@benchmark('games.easy_vs_easy')
+def bench_easy_games(quick: bool) -> float:
+    return _bench_games('easy', 'easy', quick)
+
+
+@benchmark('games.normal_vs_normal')
+def bench_normal_games(quick: bool) -> float:
+    return _bench_games('normal', 'normal', quick)
+
+
+@benchmark('games.hard_vs_hard')
+def bench_hard_games(quick: bool) -> float:
+    return _bench_games('hard', 'hard', quick)
+
+
+@benchmark('games.normal_vs_hard')
+def bench_mixed_games(quick: bool) -> float:
+    return _bench_games('normal', 'hard', quick)
+
+
+@benchmark('startup.headless_imports')
+def bench_startup(quick: bool) -> float:
+    """Median time to import the rules and AIs in a fresh interpreter"""
+    from benchmarks import startup
+    return startup.measure(3 if quick else 10)['median_ms'] / 1000
+
+
+def run(names: list, quick: bool = False, rounds: int = None) -> dict:
+    """Runs the named benchmarks, returning {name: seconds per operation}
+
+    The whole list is run `rounds` times over and each benchmark's median kept
+    """
+    if rounds is None:
+        rounds = 1 if quick else DEFAULT_ROUNDS
+    samples = {name: [] for name in names}
+    for _ in range(rounds):
+        for name in names:
+            samples[name].append(BENCHMARKS[name](quick))
+    results = {}
+    for name in names:
+        results[name] = statistics.median(samples[name])
+        print('{:<40} {:>12.2f} us'.format(name, results[name] * 1e6))
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float, overrides: dict) -> list:
+    """Gets a (name, ratio, allowed ratio) tuple for every benchmark slower than the baseline allows
+
+    A threshold given for the benchmark by name beats its registered default, which beats the overall one
+    """
+    regressions = []
+    for name, seconds in results.items():
+        expected = baseline.get(name)
+        if not expected:
+            continue
+        ratio = seconds / expected
+        allowed = 1 + overrides.get(name, THRESHOLDS.get(name, threshold))
+        if ratio > allowed:
+            regressions.append((name, ratio, allowed))
+    return regressions
+
+
+def main(args: list = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmarks the rules, AIs and full games')
+    parser.add_argument('--filter', default='', help='only run benchmarks whose name contains this')
+    parser.add_argument('--quick', action='store_true', help='fewer iterations, for a fast sanity check')
+    parser.add_argument('--rounds', type=int, help='passes over the suite (default {}, 1 with --quick)'.format(
+        DEFAULT_ROUNDS))
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--update-baseline', action='store_true', help='store these results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='allowed slowdown, 0.25 = 25%% slower (the tiny benchmarks default to {})'.format(
+                            TINY_THRESHOLD))
+    parser.add_argument('--threshold-for', action='append', default=[], metavar='NAME=RATIO',
+                        help='allowed slowdown for a single benchmark')
+    options = parser.parse_args(args)
+
+    overrides = {}
+    for override in options.threshold_for:
+        name, ratio = override.split('=')
+        overrides[name] = float(ratio)
+
+    names = [name for name in BENCHMARKS if options.filter in name]
+    results = run(names, options.quick, options.rounds)
+    report = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'quick': options.quick,
+        'results': results,
+    }
+
+    if options.output:
+        with open(options.output, 'w') as file:
+            json.dump(report, file, indent=2)
+
+    if options.update_baseline:
+        with open(options.baseline, 'w') as file:
+            json.dump(report, file, indent=2)
+        return 0
+
+    if not os.path.exists(options.baseline):
+        print('No baseline at {}, run with --update-baseline to create one'.format(options.baseline))
+        return 0
+
+    with open(options.baseline) as file:
+        baseline = json.load(file)['results']
+    regressions = compare(results, baseline, options.threshold, overrides)
+    for name, ratio, allowed in regressions:
+        print('REGRESSION {}: {:.2f}x the baseline (allowed {:.2f}x)'.format(name, ratio, allowed))
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,8 @@
+from enum import Enum
+
+
+class BoardSize(Enum):
+    """Board shapes on offer: (rows, columns, how many in a row win)"""
+    CLASSIC = (3, 3, 3)
+    FIVE_BY_FIVE = (5, 5, 4)
+    GOMOKU = (15, 15, 5)
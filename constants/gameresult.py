@@ -0,0 +1,8 @@
+from enum import Enum
+
+
+class GameResult(Enum):
+    """How a game ended"""
+    X_WON = 'X'
+    O_WON = 'O'
+    DRAW = 'Draw'
@@ -4,5 +4,6 @@ from enum import Enum
 class Screen(Enum):
     """Screen names"""
     PLAYER_SELECT = "Player Select"
+    BOARD_SELECT = "Board Select"
     DIFFICULTY_SELECT = "Difficulty Select"
     GAME = "Tic Tac Toe"
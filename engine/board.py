@@ -0,0 +1,358 @@
+"""
+Headless board core
+
+Each player's marks are kept as a bitmask (bit n set means the player holds cell n), and every line that can win
+(a run of win_length cells in a row, column or diagonal) has a per-player counter that's updated when a cell on it is
+played. A move only touches the lines through its own cell, so detecting a win costs the same on a 15x15 board as on
+the classic 3x3 one.
+
+Boards also keep a 64-bit Zobrist hash of their position (the XOR of a random key per player per filled cell), which
+each move updates with a single XOR, for use as the shared cache key (the opening book, the analysis cache and the
+search's transposition table all key on it). Layouts also give a symmetric variant: the smallest hash across the
+board's rotations and reflections. The keys are seeded from the board shape, so hashes are the same in every process
+and can be stored.
+"""
+import random
+
+from constants.playertoken import PlayerToken
+from constants.position import Position
+
+
+def _mask(*positions: int) -> int:
+    """Builds a bitmask with a bit set for each of the given cells"""
+    mask = 0
+    for position in positions:
+        mask |= 1 << position
+    return mask
+
+
+# bits per chunk when a cell mask is hashed a byte at a time
+_CHUNK_BITS = 8
+
+
+# the classic 3x3 board, used by the solved tables and the batch simulator
+ROW_MASKS = (
+    _mask(Position.TOP_LEFT, Position.TOP_EDGE, Position.TOP_RIGHT),
+    _mask(Position.LEFT_EDGE, Position.CENTER, Position.RIGHT_EDGE),
+    _mask(Position.BOTTOM_LEFT, Position.BOTTOM_EDGE, Position.BOTTOM_RIGHT),
+)
+COL_MASKS = (
+    _mask(Position.TOP_LEFT, Position.LEFT_EDGE, Position.BOTTOM_LEFT),
+    _mask(Position.TOP_EDGE, Position.CENTER, Position.BOTTOM_EDGE),
+    _mask(Position.TOP_RIGHT, Position.RIGHT_EDGE, Position.BOTTOM_RIGHT),
+)
+DIAGONAL_MASKS = (
+    _mask(Position.TOP_LEFT, Position.CENTER, Position.BOTTOM_RIGHT),
+    _mask(Position.BOTTOM_LEFT, Position.CENTER, Position.TOP_RIGHT),
+)
+
+# same order as the original row/column/diagonal checks
+WIN_MASKS = ROW_MASKS + COL_MASKS + DIAGONAL_MASKS
+
+CELL_COUNT = 9
+FULL_MASK = (1 << CELL_COUNT) - 1
+
+
+def symmetries(rows: int, cols: int) -> list:
+    """Gets the cell permutations (mapping[cell] = destination cell) for every symmetry of the board
+
+    Square boards have the 8 symmetries of the square, rectangular boards only the 4 that keep their shape
+    """
+    transforms = [
+        lambda r, c: (r, c),
+        lambda r, c: (rows - 1 - r, cols - 1 - c),
+        lambda r, c: (r, cols - 1 - c),
+        lambda r, c: (rows - 1 - r, c),
+    ]
+    if rows == cols:
+        transforms += [
+            lambda r, c: (c, rows - 1 - r),
+            lambda r, c: (cols - 1 - c, r),
+            lambda r, c: (c, r),
+            lambda r, c: (cols - 1 - c, rows - 1 - r),
+        ]
+
+    mappings = []
+    for transform in transforms:
+        mapping = []
+        for cell in range(rows * cols):
+            r, c = transform(cell // cols, cell % cols)
+            mapping.append(r * cols + c)
+        mappings.append(tuple(mapping))
+    return mappings
+
+
+class Layout:
+    """The winning lines of one board shape, precomputed once and shared by every board of that shape"""
+    def __init__(self, rows: int, cols: int, win_length: int):
+        if win_length > max(rows, cols):
+            raise ValueError('{} in a row cannot fit on a {}x{} board'.format(win_length, rows, cols))
+
+        self.rows = rows
+        self.cols = cols
+        self.win_length = win_length
+        self.cells = rows * cols
+        self.full_mask = (1 << self.cells) - 1
+
+        # runs of win_length cells, grouped by the row/column they're in, then every diagonal
+        self.row_masks = tuple(tuple(self._line(r, c, 0, 1) for c in range(cols - win_length + 1))
+                               for r in range(rows))
+        self.col_masks = tuple(tuple(self._line(r, c, 1, 0) for r in range(rows - win_length + 1))
+                               for c in range(cols))
+        self.diagonal_masks = tuple(self._line(r, c, 1, 1)
+                                    for r in range(rows - win_length + 1)
+                                    for c in range(cols - win_length + 1)) + \
+            tuple(self._line(r, c, 1, -1)
+                  for r in range(rows - win_length + 1)
+                  for c in range(win_length - 1, cols))
+        self.line_masks = sum(self.row_masks, ()) + sum(self.col_masks, ()) + self.diagonal_masks
+
+        # cell -> indexes of the lines passing through it
+        cell_lines = [[] for _ in range(self.cells)]
+        for line, mask in enumerate(self.line_masks):
+            for position in range(self.cells):
+                if mask >> position & 1:
+                    cell_lines[position].append(line)
+        self.cell_lines = tuple(tuple(lines) for lines in cell_lines)
+
+        # Zobrist keys for each player's mark on each cell
+        rng = random.Random('zobrist {}x{}'.format(rows, cols))
+        self.zobrist_x = tuple(rng.getrandbits(64) for _ in range(self.cells))
+        self.zobrist_o = tuple(rng.getrandbits(64) for _ in range(self.cells))
+        # per symmetry, per player, per byte of the cell mask: the hash of that byte's cells with the symmetry
+        # applied (built on first use)
+        self._symmetric_tables = None
+
+    def _line(self, row: int, col: int, row_step: int, col_step: int) -> int:
+        return _mask(*((row + i * row_step) * self.cols + col + i * col_step for i in range(self.win_length)))
+
+    def symmetric_hash(self, x: int, o: int) -> tuple:
+        """Gets the smallest Zobrist hash of the position across the board's rotations and reflections, which is the
+        same for every position in its symmetry class, and the index (into symmetries()) of the symmetry giving it"""
+        if self._symmetric_tables is None:
+            self._symmetric_tables = self._build_symmetric_tables()
+        best = -1
+        best_symmetry = 0
+        for symmetry, (x_tables, o_tables) in enumerate(self._symmetric_tables):
+            value = 0
+            mask = x
+            for table in x_tables:
+                value ^= table[mask & 0xff]
+                mask >>= _CHUNK_BITS
+            mask = o
+            for table in o_tables:
+                value ^= table[mask & 0xff]
+                mask >>= _CHUNK_BITS
+            if best == -1 or value < best:
+                best = value
+                best_symmetry = symmetry
+        return best, best_symmetry
+
+    def _build_symmetric_tables(self) -> list:
+        tables = []
+        for mapping in symmetries(self.rows, self.cols):
+            per_player = []
+            for keys in (self.zobrist_x, self.zobrist_o):
+                chunks = []
+                for offset in range(0, self.cells, _CHUNK_BITS):
+                    chunk = []
+                    for byte in range(1 << _CHUNK_BITS):
+                        value = 0
+                        for bit in range(_CHUNK_BITS):
+                            if byte >> bit & 1 and offset + bit < self.cells:
+                                value ^= keys[mapping[offset + bit]]
+                        chunk.append(value)
+                    chunks.append(chunk)
+                per_player.append(chunks)
+            tables.append(tuple(per_player))
+        return tables
+
+
+_layouts = {}
+
+
+def get_layout(rows: int = 3, cols: int = 3, win_length: int = 3) -> Layout:
+    """Gets the shared layout for the given board shape"""
+    key = (rows, cols, win_length)
+    layout = _layouts.get(key)
+    if layout is None:
+        layout = _layouts[key] = Layout(rows, cols, win_length)
+    return layout
+
+
+CLASSIC_LAYOUT = get_layout()
+
+
+class Board:
+    """Per-player bitmasks and line counters describing an m x n, k-in-a-row board"""
+    def __init__(self, rows: int = 3, cols: int = 3, win_length: int = 3):
+        self.layout = get_layout(rows, cols, win_length)
+        self.x = 0
+        self.o = 0
+        # Zobrist hash of the position, kept up to date by place and remove
+        self.hash = 0
+        # marks each player has on every line, and how many lines each player has filled
+        self._counts = {PlayerToken.X: [0] * len(self.layout.line_masks),
+                        PlayerToken.O: [0] * len(self.layout.line_masks)}
+        self._complete = {PlayerToken.X: 0, PlayerToken.O: 0}
+        # every cell, with the free ones first: a move swaps its cell to the end of the free section, so playing,
+        # undoing and picking a free cell are O(1), and clearing only resets the free count
+        self._free = list(range(self.layout.cells))
+        self._slots = list(range(self.layout.cells))
+        self._free_count = self.layout.cells
+
+    @property
+    def cells(self) -> int:
+        return self.layout.cells
+
+    def mask(self, token: PlayerToken) -> int:
+        """Gets the bitmask of cells held by the given token"""
+        return self.x if token == PlayerToken.X else self.o
+
+    @property
+    def occupied(self) -> int:
+        """Bitmask of every filled cell"""
+        return self.x | self.o
+
+    def place(self, position: int, token: PlayerToken) -> bool:
+        """Marks the given cell for the given token, returning whether it completed a line
+
+        Only the lines through the cell are touched, via the layout's cell -> lines index
+        """
+        if token == PlayerToken.X:
+            self.x |= 1 << position
+            self.hash ^= self.layout.zobrist_x[position]
+        else:
+            self.o |= 1 << position
+            self.hash ^= self.layout.zobrist_o[position]
+        self._swap_free(position, self._free_count - 1)
+        self._free_count -= 1
+
+        counts = self._counts[token]
+        win_length = self.layout.win_length
+        won = False
+        for line in self.layout.cell_lines[position]:
+            counts[line] += 1
+            if counts[line] == win_length:
+                self._complete[token] += 1
+                won = True
+        return won
+
+    def remove(self, position: int, token: PlayerToken):
+        """Takes the given token's mark back off the cell (undoes place)"""
+        if token == PlayerToken.X:
+            self.x &= ~(1 << position)
+            self.hash ^= self.layout.zobrist_x[position]
+        else:
+            self.o &= ~(1 << position)
+            self.hash ^= self.layout.zobrist_o[position]
+        self._swap_free(position, self._free_count)
+        self._free_count += 1
+
+        counts = self._counts[token]
+        win_length = self.layout.win_length
+        for line in self.layout.cell_lines[position]:
+            if counts[line] == win_length:
+                self._complete[token] -= 1
+            counts[line] -= 1
+
+    def copy(self) -> 'Board':
+        """Gets an independent board in the same position (e.g. for an AI to search on)"""
+        board = Board.__new__(Board)
+        board.layout = self.layout
+        board.x = self.x
+        board.o = self.o
+        board.hash = self.hash
+        board._counts = {token: counts[:] for token, counts in self._counts.items()}
+        board._complete = dict(self._complete)
+        board._free = self._free[:]
+        board._slots = self._slots[:]
+        board._free_count = self._free_count
+        return board
+
+    def _swap_free(self, position: int, slot: int):
+        """Moves the given cell to the given slot of the free cell list"""
+        other = self._free[slot]
+        current = self._slots[position]
+        self._free[slot] = position
+        self._free[current] = other
+        self._slots[position] = slot
+        self._slots[other] = current
+
+    def free_count(self) -> int:
+        """Number of empty cells"""
+        return self._free_count
+
+    def free_cells(self) -> list:
+        """Gets every empty cell, in no particular order"""
+        return self._free[:self._free_count]
+
+    def random_free_cell(self) -> int:
+        """Picks a uniformly random empty cell, or -1 if the board is full"""
+        if not self._free_count:
+            return -1
+        return self._free[random.randrange(self._free_count)]
+
+    def line_counts(self, token: PlayerToken) -> list:
+        """Marks the given token has on each line of the layout (read-only)"""
+        return self._counts[token]
+
+    def clear(self):
+        """Empties the board"""
+        self.x = 0
+        self.o = 0
+        self.hash = 0
+        self._free_count = self.layout.cells
+        for counts in self._counts.values():
+            counts[:] = [0] * len(counts)
+        self._complete[PlayerToken.X] = 0
+        self._complete[PlayerToken.O] = 0
+
+    def is_empty(self, position: int) -> bool:
+        """Checks if the given cell is still free"""
+        return not (self.x | self.o) >> position & 1
+
+    def move_count(self) -> int:
+        """Number of filled cells"""
+        return self.layout.cells - self._free_count
+
+    def has_line(self, masks=None, token: PlayerToken = None) -> bool:
+        """Checks if a player (or the given token's player) owns every cell of any of the given lines
+
+        Without masks, every line of the board is checked using the counters
+        """
+        if masks is None:
+            if token is None:
+                return self._complete[PlayerToken.X] > 0 or self._complete[PlayerToken.O] > 0
+            return self._complete[token] > 0
+
+        players = (self.x, self.o) if token is None else (self.mask(token),)
+        for player in players:
+            for line in masks:
+                if player & line == line:
+                    return True
+        return False
+
+    def winner(self) -> PlayerToken:
+        """Gets the token that has completed a line, or None"""
+        if self._complete[PlayerToken.X]:
+            return PlayerToken.X
+        if self._complete[PlayerToken.O]:
+            return PlayerToken.O
+        return None
+
+    def is_full(self) -> bool:
+        """Checks if every cell has been filled"""
+        return not self._free_count
+
+    def completing_cell(self, token: PlayerToken) -> int:
+        """Gets the first cell (in line order) that would complete a line for the given token, or -1"""
+        mine = self._counts[token]
+        theirs = self._counts[PlayerToken.O if token == PlayerToken.X else PlayerToken.X]
+        needed = self.layout.win_length - 1
+        occupied = self.x | self.o
+        for line, count in enumerate(mine):
+            if count == needed and theirs[line] == 0:
+                free = self.layout.line_masks[line] & ~occupied
+                return free.bit_length() - 1
+        return -1
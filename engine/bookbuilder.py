@@ -0,0 +1,154 @@
+"""
+Offline opening book builder
+
+Collects every position of the first few plies of a 3x3 game, reduced to its canonical form (the smallest key across
+the board's 8 symmetries, relative to the side to move), with a weight for each cell: optimal moves get 1 plus the
+number of replies that lose for the opponent, so moves that set traps come up more often, and every other move gets 0.
+A side's first mark keeps to the corners and the center like the old scripted openings did, and on the empty board
+they're weighted evenly, so the AI opens in a corner 4 times out of 5 and in the center otherwise. The book is a sorted
+binary file that HardAI opens with mmap and binary searches:
+
+    magic b'TTB1', entry count, max marks      (3 x 4 bytes, little endian)
+    keys                                       (entry count x uint32, sorted)
+    weights                                    (entry count x 9 x uint8, in key order)
+
+Run as a script to regenerate the book used by HardAI:
+    python -m engine.bookbuilder [output path] [--plies 5]
+"""
+import argparse
+import os
+import struct
+import sys
+from array import array
+
+from engine import solver
+from constants.position import Position
+from engine.board import CELL_COUNT, FULL_MASK, symmetries
+
+BOOK_MAGIC = b'TTB1'
+BOOK_HEADER = struct.Struct('<4sII')
+DEFAULT_BOOK_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                 'players', 'ai', 'data', 'openingbook.bin')
+
+# positions with up to this many marks are in the book by default (the first five plies)
+DEFAULT_PLIES = 5
+
+# cells a side's first mark can go in (never an edge)
+FIRST_MARK_CELLS = sum(1 << position for position in (Position.TOP_LEFT, Position.TOP_RIGHT, Position.CENTER,
+                                                      Position.BOTTOM_LEFT, Position.BOTTOM_RIGHT))
+
+
+def _permutation_tables() -> list:
+    """Maps every 9-bit cell mask through each board symmetry"""
+    tables = []
+    for mapping in symmetries(3, 3):
+        table = []
+        for mask in range(1 << CELL_COUNT):
+            permuted = 0
+            for position in range(CELL_COUNT):
+                if mask >> position & 1:
+                    permuted |= 1 << mapping[position]
+            table.append(permuted)
+        tables.append(table)
+    return tables
+
+
+PERMUTATIONS = _permutation_tables()
+MAPPINGS = symmetries(3, 3)
+
+
+def canonical(mover: int, waiting: int) -> tuple:
+    """Gets the (key, symmetry) of the position's canonical form"""
+    best_key = -1
+    best_symmetry = 0
+    for symmetry, table in enumerate(PERMUTATIONS):
+        key = table[mover] << CELL_COUNT | table[waiting]
+        if best_key == -1 or key < best_key:
+            best_key = key
+            best_symmetry = symmetry
+    return best_key, best_symmetry
+
+
+def _weights(table: array, mover: int, waiting: int) -> list:
+    """Weights every cell of the position: 0 unless optimal, otherwise 1 plus the opponent's losing replies
+
+    A first mark only goes in a corner or the center, and the opening move doesn't count traps
+    """
+    _, _, moves = solver.unpack(table[solver.index_of(mover, waiting)])
+    if not mover and moves & FIRST_MARK_CELLS:
+        moves &= FIRST_MARK_CELLS
+    weights = [0] * CELL_COUNT
+    for position in range(CELL_COUNT):
+        if not moves >> position & 1:
+            continue
+        if not waiting:
+            weights[position] = 1
+            continue
+        played = mover | 1 << position
+        traps = 0
+        free = ~(played | waiting) & FULL_MASK
+        while free:
+            bit = free & -free
+            free ^= bit
+            # after the opponent's reply it's our move again, so a win for the mover is a losing reply
+            value, _, _ = solver.unpack(table[solver.index_of(played, waiting | bit)])
+            if value == solver.WIN:
+                traps += 1
+        weights[position] = 1 + traps
+    return weights
+
+
+def build_book(plies: int = DEFAULT_PLIES, table: array = None) -> dict:
+    """Gets {canonical key: cell weights} for every unfinished position with fewer than `plies` marks"""
+    if table is None:
+        table = solver.build_table()
+    book = {}
+    frontier = {(0, 0)}
+    for _ in range(plies):
+        next_frontier = set()
+        for mover, waiting in frontier:
+            value, distance, _ = solver.unpack(table[solver.index_of(mover, waiting)])
+            if value is None or distance == 0:
+                continue
+            key, symmetry = canonical(mover, waiting)
+            if key not in book:
+                weights = _weights(table, mover, waiting)
+                canonical_weights = [0] * CELL_COUNT
+                for position, weight in enumerate(weights):
+                    canonical_weights[MAPPINGS[symmetry][position]] = weight
+                book[key] = canonical_weights
+            free = ~(mover | waiting) & FULL_MASK
+            while free:
+                bit = free & -free
+                free ^= bit
+                next_frontier.add((waiting, mover | bit))
+        frontier = next_frontier
+    return book
+
+
+def pack_book(book: dict, plies: int = DEFAULT_PLIES) -> bytes:
+    """Lays the book out in the file format"""
+    keys = array('I', sorted(book))
+    if sys.byteorder != 'little':
+        keys.byteswap()
+    weights = bytearray()
+    for key in sorted(book):
+        weights += bytes(book[key])
+    return BOOK_HEADER.pack(BOOK_MAGIC, len(book), plies - 1) + keys.tobytes() + bytes(weights)
+
+
+def write_book(path: str = DEFAULT_BOOK_PATH, plies: int = DEFAULT_PLIES):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    book = build_book(plies)
+    with open(path, 'wb') as file:
+        file.write(pack_book(book, plies))
+    return book
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Builds the opening book used by HardAI')
+    parser.add_argument('output', nargs='?', default=DEFAULT_BOOK_PATH)
+    parser.add_argument('--plies', type=int, default=DEFAULT_PLIES, help='number of plies the book covers')
+    options = parser.parse_args()
+    written = write_book(options.output, options.plies)
+    print('Wrote {} positions to {}'.format(len(written), options.output))
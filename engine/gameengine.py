@@ -0,0 +1,126 @@
+"""
+Kivy-free game rules
+
+Handles turn order, move application and end detection for a single game, so the AIs can play against it without
+a window stack (e.g. for bulk simulation). The Game screen wraps an engine and mirrors it for the UI.
+"""
+from constants.gameresult import GameResult
+from constants.playertoken import PlayerToken
+from engine import metrics
+from engine.board import Board
+
+
+class GameEngine:
+    """Rules and state of a single game on an m x n board where win_length in a row wins"""
+    def __init__(self, first_player: PlayerToken = PlayerToken.X, rows: int = 3, cols: int = 3,
+                 win_length: int = 3):
+        self.rows = rows
+        self.cols = cols
+        self.win_length = win_length
+        self.board = Board(rows, cols, win_length)
+        # same layout as the Game screen's state, which the AIs read
+        self.state = [''] * self.board.cells
+        self.first_player = first_player
+        self.current_player = first_player
+        self.result = None
+        # cells played so far, in order, and an optional writer that's handed every finished game
+        self.moves = []
+        self.recorder = None
+
+    @property
+    def grid_size(self) -> int:
+        """Side length of the board (the row count for non-square boards)"""
+        return self.rows
+
+    def legal_moves(self) -> list:
+        """Gets every cell that can still be played, in no particular order"""
+        if self.result is not None:
+            return []
+        return self.board.free_cells()
+
+    def apply_move(self, position: int) -> GameResult:
+        """Plays the current player's token in the given cell, returning the result if the game ended"""
+        if self.result is not None:
+            raise ValueError('The game is already over')
+        if not 0 <= position < self.board.cells or not self.board.is_empty(position):
+            raise ValueError('Cell {} cannot be played'.format(position))
+
+        token = self.current_player
+        self.state[position] = token.value
+        self.moves.append(position)
+
+        # only the lines through this cell can have been completed, and a full board without a win is a draw
+        if self.board.place(position, token):
+            self.result = GameResult.X_WON if token == PlayerToken.X else GameResult.O_WON
+        elif self.board.is_full():
+            self.result = GameResult.DRAW
+
+        self.current_player = PlayerToken.O if token == PlayerToken.X else PlayerToken.X
+        # recorded once the move is fully applied, so a failing recorder can't leave the game half updated
+        if self.result is not None and self.recorder is not None:
+            self.recorder.write_game(self)
+        return self.result
+
+    def undo_move(self):
+        """Takes the last move back, reopening the game if it had ended"""
+        if not self.moves:
+            raise ValueError('No move to undo')
+        position = self.moves.pop()
+        token = PlayerToken(self.state[position])
+        self.state[position] = ''
+        self.board.remove(position, token)
+        self.result = None
+        self.current_player = token
+
+    def fill_cell(self, position: int, token: PlayerToken):
+        """Selects a cell using the given token (the interface players use to move)"""
+        if token != self.current_player:
+            raise ValueError("It is not {}'s turn".format(token.value))
+        self.apply_move(position)
+
+    def reset(self, first_player: PlayerToken = PlayerToken.X):
+        """Clears the board for a new game"""
+        for i in range(len(self.state)):
+            self.state[i] = ''
+        self.board.clear()
+        self.first_player = first_player
+        self.current_player = first_player
+        self.result = None
+        self.moves.clear()
+
+    def set_position(self, x: int, o: int, first_player: PlayerToken = PlayerToken.X):
+        """Sets up the position with the given cell masks directly (e.g. one restored from storage)
+
+        The order the cells were played in isn't known, so moves gets one that reaches the same position
+        """
+        self.reset(first_player)
+        second_player = PlayerToken.O if first_player == PlayerToken.X else PlayerToken.X
+        cells = {PlayerToken.X: [position for position in range(self.board.cells) if x >> position & 1],
+                 PlayerToken.O: [position for position in range(self.board.cells) if o >> position & 1]}
+        if not 0 <= len(cells[first_player]) - len(cells[second_player]) <= 1 or x & o:
+            raise ValueError('{} moving first cannot reach this position'.format(first_player.value))
+        turns = [first_player, second_player]
+        for ply in range(len(cells[first_player]) + len(cells[second_player])):
+            token = turns[ply % 2]
+            position = cells[token][ply // 2]
+            self.state[position] = token.value
+            self.moves.append(position)
+            self.board.place(position, token)
+
+        winner = self.board.winner()
+        if winner is not None:
+            self.result = GameResult.X_WON if winner == PlayerToken.X else GameResult.O_WON
+        elif self.board.is_full():
+            self.result = GameResult.DRAW
+        self.current_player = turns[len(self.moves) % 2]
+
+
+metrics.track(GameEngine, 'apply_move')
+
+
+def play(engine: GameEngine, *players) -> GameResult:
+    """Lets the given players (created with the engine as their game) take turns until the game ends"""
+    turns = {player.token: player for player in players}
+    while engine.result is None:
+        turns[engine.current_player].move()
+    return engine.result
@@ -0,0 +1,252 @@
+"""
+Compact binary game records
+
+A record file is a short header followed by chunks of games, each chunk holding games on a single board shape:
+
+    file header   b'TTTG', version                                               (5 bytes)
+    chunk header  game count, payload length, CRC-32 of the payload, rows, cols, win_length
+                                                                                 (3 x uint32 + 3 x uint8, little endian)
+    payload       the chunk's games back to back
+
+Each game is a flags byte (bits 0-1 the result, bit 2 set if O moved first) followed by its cells in the order they
+were played. Boards of up to 15 cells store the move count in the flags byte's high nibble and pack two cells per
+byte (first move in the low nibble), so a full 3x3 game takes 6 bytes and a quick win 4. Larger boards add a move
+count byte and store a byte per cell.
+
+Writers only ever append whole chunks, so a file can be extended by several sessions, and a chunk cut short by a
+crash is dropped by the reader instead of corrupting the rest. Readers decode lazily, a chunk at a time.
+
+    python -m engine.gamerecord games.ttt            replays and verifies every game in the file
+"""
+import argparse
+import struct
+import sys
+import time
+import zlib
+from collections import namedtuple
+
+from constants.gameresult import GameResult
+from constants.playertoken import PlayerToken
+from engine.gameengine import GameEngine
+
+MAGIC = b'TTTG'
+VERSION = 1
+_FILE_HEADER = struct.Struct('<4sB')
+_CHUNK_HEADER = struct.Struct('<IIIBBB')
+
+# games are buffered until a chunk holds this many bytes
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+_RESULT_CODES = {GameResult.X_WON: 1, GameResult.O_WON: 2, GameResult.DRAW: 3}
+_RESULTS = {code: result for result, code in _RESULT_CODES.items()}
+_O_FIRST = 0x04
+
+# boards up to this size pack two cells per byte (the move count has to fit in a nibble), and the move count has to fit
+# in a byte on bigger ones
+NIBBLE_CELLS = 15
+MAX_CELLS = 255
+
+GameRecord = namedtuple('GameRecord', 'rows cols win_length first_player result moves')
+
+
+def encode_game(first_player: PlayerToken, result: GameResult, moves: list, cells: int = 9) -> bytes:
+    """Encodes one finished game"""
+    flags = _RESULT_CODES[result] | (_O_FIRST if first_player == PlayerToken.O else 0)
+    if cells > NIBBLE_CELLS:
+        return bytes([flags, len(moves)]) + bytes(moves)
+
+    packed = bytearray([flags | len(moves) << 4])
+    for i in range(0, len(moves) - 1, 2):
+        packed.append(moves[i] | moves[i + 1] << 4)
+    if len(moves) % 2:
+        packed.append(moves[-1])
+    return bytes(packed)
+
+
+def decode_game(raw: bytes, cells: int = 9) -> tuple:
+    """Decodes one game into (first player, result, moves)"""
+    flags = raw[0]
+    first_player = PlayerToken.O if flags & _O_FIRST else PlayerToken.X
+    result = _RESULTS.get(flags & 0x03)
+    if cells > NIBBLE_CELLS:
+        return first_player, result, list(raw[2:])
+
+    moves = []
+    for byte in raw[1:]:
+        moves.append(byte & 0x0F)
+        moves.append(byte >> 4)
+    del moves[flags >> 4:]
+    return first_player, result, moves
+
+
+class GameRecordWriter:
+    """Appends games to a record file, a chunk at a time
+
+    Can be set as a GameEngine's recorder to log every game it finishes. Games on a new board shape start a new chunk.
+    """
+    def __init__(self, path: str, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self._shape = None
+        self._buffer = bytearray()
+        self._count = 0
+        self._file = open(path, 'ab')
+        if self._file.tell() == 0:
+            self._file.write(_FILE_HEADER.pack(MAGIC, VERSION))
+        else:
+            with open(path, 'rb') as file:
+                _read_header(file)
+
+    def write(self, first_player: PlayerToken, result: GameResult, moves: list, rows: int = 3, cols: int = 3,
+              win_length: int = 3):
+        """Adds a finished game"""
+        if rows * cols > MAX_CELLS:
+            raise ValueError('Records are limited to boards of {} cells'.format(MAX_CELLS))
+        shape = (rows, cols, win_length)
+        if shape != self._shape:
+            self.flush()
+            self._shape = shape
+
+        self._buffer += encode_game(first_player, result, moves, rows * cols)
+        self._count += 1
+        if len(self._buffer) >= self.chunk_size:
+            self.flush()
+
+    def write_game(self, engine: GameEngine):
+        """Adds the game the engine just finished"""
+        self.write(engine.first_player, engine.result, engine.moves, engine.rows, engine.cols, engine.win_length)
+
+    def flush(self):
+        """Writes out the buffered games as a chunk"""
+        if not self._count:
+            return
+        payload = bytes(self._buffer)
+        self._file.write(_CHUNK_HEADER.pack(self._count, len(payload), zlib.crc32(payload), *self._shape))
+        self._file.write(payload)
+        self._file.flush()
+        self._buffer.clear()
+        self._count = 0
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _read_header(file):
+    """Checks the file header"""
+    header = file.read(_FILE_HEADER.size)
+    if len(header) < _FILE_HEADER.size or _FILE_HEADER.unpack(header) != (MAGIC, VERSION):
+        raise ValueError('Not a game record file (or an unsupported version)')
+
+
+class GameRecordReader:
+    """Iterates over the games in a record file without loading it all"""
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as file:
+            _read_header(file)
+        # chunks that failed their checksum or were cut short
+        self.damaged_chunks = 0
+
+    def chunks(self):
+        """Yields (rows, cols, win_length, game count, payload) for every intact chunk"""
+        self.damaged_chunks = 0
+        with open(self.path, 'rb') as file:
+            file.seek(_FILE_HEADER.size)
+            while True:
+                header = file.read(_CHUNK_HEADER.size)
+                if not header:
+                    return
+                if len(header) < _CHUNK_HEADER.size:
+                    self.damaged_chunks += 1
+                    return
+                count, length, checksum, rows, cols, win_length = _CHUNK_HEADER.unpack(header)
+                payload = file.read(length)
+                if len(payload) < length:
+                    self.damaged_chunks += 1
+                    return
+                if zlib.crc32(payload) != checksum:
+                    self.damaged_chunks += 1
+                    continue
+                yield rows, cols, win_length, count, payload
+
+    def raw_games(self):
+        """Yields (rows, cols, win_length, encoded game) for every game"""
+        for rows, cols, win_length, count, payload in self.chunks():
+            wide = rows * cols > NIBBLE_CELLS
+            position = 0
+            for _ in range(count):
+                if wide:
+                    size = 2 + payload[position + 1]
+                else:
+                    size = 1 + ((payload[position] >> 4) + 1) // 2
+                yield rows, cols, win_length, payload[position:position + size]
+                position += size
+
+    def __iter__(self):
+        """Yields a GameRecord for every game"""
+        for rows, cols, win_length, raw in self.raw_games():
+            yield GameRecord(rows, cols, win_length, *decode_game(raw, rows * cols))
+
+    def verify(self) -> tuple:
+        """Replays every game through the engine, returning (games checked, games whose result didn't match)
+
+        Small boards have few distinct games, so each encoding is only replayed the first time it's seen
+        """
+        engines = {}
+        cache = {}
+        checked = 0
+        invalid = 0
+        for rows, cols, win_length, raw in self.raw_games():
+            checked += 1
+            shape = (rows, cols, win_length)
+            small = rows * cols <= NIBBLE_CELLS
+            valid = cache.get((shape, raw)) if small else None
+            if valid is None:
+                engine = engines.get(shape)
+                if engine is None:
+                    engine = engines[shape] = GameEngine(PlayerToken.X, rows, cols, win_length)
+                valid = _replay(engine, *decode_game(raw, rows * cols))
+                if small:
+                    cache[(shape, raw)] = valid
+            if not valid:
+                invalid += 1
+        return checked, invalid
+
+
+def _replay(engine: GameEngine, first_player: PlayerToken, result: GameResult, moves: list) -> bool:
+    """Checks the moves are legal and end the game with the recorded result"""
+    engine.reset(first_player)
+    try:
+        for move in moves:
+            engine.apply_move(move)
+    except ValueError:
+        return False
+    return engine.result == result
+
+
+def main(args: list = None) -> int:
+    parser = argparse.ArgumentParser(description='Replays and verifies the games in a record file')
+    parser.add_argument('path')
+    options = parser.parse_args(args)
+
+    reader = GameRecordReader(options.path)
+    started = time.perf_counter()
+    checked, invalid = reader.verify()
+    elapsed = time.perf_counter() - started
+    print('{} games verified in {:.2f}s ({:.0f} games/minute)'.format(
+        checked, elapsed, checked / elapsed * 60 if elapsed else 0))
+    if invalid or reader.damaged_chunks:
+        print('{} games did not replay to their recorded result, {} damaged chunks'.format(
+            invalid, reader.damaged_chunks))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,158 @@
+"""
+Optional hot-path instrumentation
+
+Methods are registered with track() and only get wrapped in a timer while collection is enabled, so a disabled
+collector costs nothing per call: disable() puts the original functions back. Player registers its move(),
+choose_target() (the AI's thinking time) and get_completing_target() for itself and every subclass, the Game screen
+registers check_end_conditions().
+
+    metrics.enable()
+    ...                               play some games
+    metrics.snapshot()                {'move.HardAI': {'count': ..., 'total_ms': ..., 'mean_us': ..., 'max_us': ...}}
+    metrics.dump_json('metrics.json')
+
+start_profiling()/stop_profiling(path) capture a cProfile of the same session, readable with pstats or turned into a
+flamegraph with tools like snakeviz or flameprof. Anything beyond the bare minimum is only imported when used, this
+module is loaded by every player and shouldn't add to startup.
+"""
+import _thread
+import time
+
+_lock = _thread.allocate_lock()
+_enabled = False
+_profiler = None
+
+# (class, attribute, metric) for every registered method, and the original function of each wrapped one
+_targets = []
+_originals = {}
+
+# metric name -> Timer
+_timers = {}
+
+
+class Timer:
+    """Call count and time spent in one instrumented method"""
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def to_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'total_ms': self.total * 1e3,
+            'mean_us': self.total / self.count * 1e6 if self.count else 0.0,
+            'max_us': self.max * 1e6,
+        }
+
+
+def _record(name: str, seconds: float):
+    with _lock:
+        timer = _timers.get(name)
+        if timer is None:
+            timer = _timers[name] = Timer()
+        timer.add(seconds)
+
+
+def _wrap(function, attribute: str, metric: str):
+    """Times calls to a method under '<metric>.<class of self>'
+
+    Only the most derived override records a call, so a subclass calling up through super() is counted once
+    """
+    import functools
+
+    @functools.wraps(function)
+    def timed(self, *args, **kwargs):
+        if getattr(type(self), attribute) is not timed:
+            return function(self, *args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return function(self, *args, **kwargs)
+        finally:
+            _record('{}.{}'.format(metric, type(self).__name__), time.perf_counter() - started)
+    return timed
+
+
+def _instrument(cls, attribute: str, metric: str):
+    if (cls, attribute) not in _originals:
+        _originals[(cls, attribute)] = cls.__dict__[attribute]
+        setattr(cls, attribute, _wrap(cls.__dict__[attribute], attribute, metric))
+
+
+def track(cls, attribute: str, metric: str = None):
+    """Registers a method defined on the class for timing (wrapped straight away if collection is on)"""
+    if attribute not in cls.__dict__:
+        return
+    metric = metric or attribute
+    with _lock:
+        _targets.append((cls, attribute, metric))
+        if _enabled:
+            _instrument(cls, attribute, metric)
+
+
+def enable():
+    """Starts collecting metrics for every registered method"""
+    global _enabled
+    with _lock:
+        _enabled = True
+        for cls, attribute, metric in _targets:
+            _instrument(cls, attribute, metric)
+
+
+def disable():
+    """Stops collecting and restores the original methods (the metrics collected so far are kept)"""
+    global _enabled
+    with _lock:
+        _enabled = False
+        for (cls, attribute), function in _originals.items():
+            setattr(cls, attribute, function)
+        _originals.clear()
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset():
+    """Forgets the metrics collected so far"""
+    with _lock:
+        _timers.clear()
+
+
+def snapshot() -> dict:
+    """Gets the collected metrics by name"""
+    with _lock:
+        return {name: timer.to_dict() for name, timer in sorted(_timers.items())}
+
+
+def dump_json(path: str):
+    """Writes the collected metrics to a JSON file"""
+    import json
+    with open(path, 'w') as file:
+        json.dump(snapshot(), file, indent=2)
+
+
+def start_profiling():
+    """Starts a cProfile capture of the current thread"""
+    import cProfile
+    global _profiler
+    _profiler = cProfile.Profile()
+    _profiler.enable()
+
+
+def stop_profiling(path: str = None):
+    """Ends the cProfile capture, writing it to the given file (in pstats format) if there is one"""
+    global _profiler
+    profiler, _profiler = _profiler, None
+    if profiler is None:
+        return None
+    profiler.disable()
+    if path:
+        profiler.dump_stats(path)
+    return profiler
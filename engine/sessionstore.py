@@ -0,0 +1,129 @@
+"""
+Packed store of in-progress games
+
+Keeps parked games in a few flat columns instead of live engines and players, so a server can hold a very large
+number of idle games. Each game takes 10 bytes:
+
+    x, o     uint32   each player's cell mask (boards of up to 32 cells)
+    shape    uint8    index of the board's (rows, cols, win_length) in the store's shape list, 0 for a free slot
+    flags    uint8    bit 0: O moved first, bits 1-2: difficulty (0 for two-player games), bit 3: HardAI variety off
+
+Whose turn it is and the result follow from the masks. Masks of larger boards (e.g. gomoku) are kept in a dict on the
+side. Removed slots go on a free list and are handed out again by add.
+"""
+from array import array
+from collections import namedtuple
+
+from constants.difficulty import Difficulty
+from constants.playertoken import PlayerToken
+from engine.gameengine import GameEngine
+
+# boards with more cells than this don't fit the mask columns
+MAX_PACKED_CELLS = 32
+
+_O_FIRST = 0x1
+_DIFFICULTY_SHIFT = 1
+_DIFFICULTY_MASK = 0x6
+_NO_VARIETY = 0x8
+
+StoredGame = namedtuple('StoredGame', 'engine difficulty variety')
+
+
+class SessionStore:
+    """Games packed into array columns, addressed by slot number"""
+    def __init__(self):
+        self._x = array('I')
+        self._o = array('I')
+        self._shape = array('B')
+        self._flags = array('B')
+        # slots given back by remove, reused last-in first-out
+        self._free = array('I')
+        # (rows, cols, win_length) of every board shape seen, and their index + 1 in the shape column
+        self._shapes = []
+        self._shape_ids = {}
+        # slot -> (x, o) for boards too large for the columns
+        self._large = {}
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, slot: int) -> bool:
+        return 0 <= slot < len(self._shape) and self._shape[slot] != 0
+
+    @property
+    def nbytes(self) -> int:
+        """Memory taken by the columns (not counting the dict of large boards)"""
+        return sum(len(column) * column.itemsize for column in (self._x, self._o, self._shape, self._flags, self._free))
+
+    def add(self, engine: GameEngine, difficulty: Difficulty = None, variety: bool = True) -> int:
+        """Packs a game into a free slot, returning the slot"""
+        if self._free:
+            slot = self._free.pop()
+        else:
+            slot = len(self._shape)
+            self._x.append(0)
+            self._o.append(0)
+            self._shape.append(0)
+            self._flags.append(0)
+        self._count += 1
+        self._pack(slot, engine, difficulty, variety)
+        return slot
+
+    def save(self, slot: int, engine: GameEngine, difficulty: Difficulty = None, variety: bool = True):
+        """Packs a game into the given slot, replacing what was there
+
+        difficulty is None for two-player games, and variety is HardAI's setting
+        """
+        if slot not in self:
+            raise KeyError(slot)
+        self._pack(slot, engine, difficulty, variety)
+
+    def _pack(self, slot: int, engine: GameEngine, difficulty: Difficulty, variety: bool):
+        shape = (engine.rows, engine.cols, engine.win_length)
+        shape_id = self._shape_ids.get(shape)
+        if shape_id is None:
+            if len(self._shapes) == 255:
+                raise ValueError('Too many board shapes')
+            self._shapes.append(shape)
+            shape_id = self._shape_ids[shape] = len(self._shapes)
+
+        board = engine.board
+        if board.cells > MAX_PACKED_CELLS:
+            self._large[slot] = (board.x, board.o)
+            self._x[slot] = self._o[slot] = 0
+        else:
+            self._large.pop(slot, None)
+            self._x[slot] = board.x
+            self._o[slot] = board.o
+        self._shape[slot] = shape_id
+
+        flags = _O_FIRST if engine.first_player == PlayerToken.O else 0
+        if difficulty is not None:
+            flags |= difficulty.value << _DIFFICULTY_SHIFT
+        if not variety:
+            flags |= _NO_VARIETY
+        self._flags[slot] = flags
+
+    def load(self, slot: int) -> StoredGame:
+        """Unpacks the game in the given slot into a new engine"""
+        if slot not in self:
+            raise KeyError(slot)
+        flags = self._flags[slot]
+        engine = GameEngine(PlayerToken.O if flags & _O_FIRST else PlayerToken.X, *self._shapes[self._shape[slot] - 1])
+        if slot in self._large:
+            engine.set_position(*self._large[slot], engine.first_player)
+        else:
+            engine.set_position(self._x[slot], self._o[slot], engine.first_player)
+
+        difficulty = (flags & _DIFFICULTY_MASK) >> _DIFFICULTY_SHIFT
+        return StoredGame(engine, Difficulty(difficulty) if difficulty else None, not flags & _NO_VARIETY)
+
+    def remove(self, slot: int):
+        """Frees the given slot for reuse"""
+        if slot not in self:
+            raise KeyError(slot)
+        self._shape[slot] = 0
+        self._large.pop(slot, None)
+        self._free.append(slot)
+        self._count -= 1
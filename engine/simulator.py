@@ -0,0 +1,181 @@
+"""
+NumPy batch game simulator
+
+Plays many AI-vs-AI games at once for difficulty calibration. Every board in the batch is a pair of 9-bit player
+masks, and the win check and AI policies are precomputed lookup tables over those masks, so each ply is a handful of
+array gathers over the whole batch instead of per-game Python calls.
+
+Run as a script for a quick study:
+    python -m engine.simulator [games] [x difficulty] [o difficulty] [seed]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+from constants.difficulty import Difficulty
+from engine import solver
+from engine.board import WIN_MASKS, FULL_MASK, CELL_COUNT
+
+_ALL_MASKS = np.arange(1 << CELL_COUNT)
+
+
+def _popcounts() -> np.ndarray:
+    counts = np.zeros(1 << CELL_COUNT, np.int8)
+    for position in range(CELL_COUNT):
+        counts += (_ALL_MASKS >> position & 1).astype(np.int8)
+    return counts
+
+
+def _wins() -> np.ndarray:
+    wins = np.zeros(1 << CELL_COUNT, bool)
+    for line in WIN_MASKS:
+        wins |= _ALL_MASKS & line == line
+    return wins
+
+
+def _nth_cells() -> np.ndarray:
+    """NTH_CELL[mask, n] is the cell of the n-th set bit of the mask"""
+    cells = np.full((1 << CELL_COUNT, CELL_COUNT), -1, np.int8)
+    for mask in range(1 << CELL_COUNT):
+        n = 0
+        for position in range(CELL_COUNT):
+            if mask >> position & 1:
+                cells[mask, n] = position
+                n += 1
+    return cells
+
+
+def _completing_cells() -> np.ndarray:
+    """COMPLETING[mine << 9 | theirs] is the mask of every cell that completes a line for `mine`
+
+    Every completing cell is kept, like the threat table AI.get_completing_target picks from at random
+    """
+    mine = _ALL_MASKS[:, np.newaxis]
+    theirs = _ALL_MASKS[np.newaxis, :]
+    cells = np.zeros((1 << CELL_COUNT, 1 << CELL_COUNT), np.int16)
+    for line in WIN_MASKS:
+        for position in range(CELL_COUNT):
+            bit = 1 << position
+            if not line & bit:
+                continue
+            rest = line ^ bit
+            completes = (mine & line == rest) & (theirs & line == 0)
+            cells[completes] |= bit
+    return cells.reshape(-1)
+
+
+POPCOUNT = _popcounts()
+WINS = _wins()
+NTH_CELL = _nth_cells()
+COMPLETING = _completing_cells()
+
+
+def _normal_cells() -> np.ndarray:
+    """NORMAL[mine << 9 | theirs] is the mask of NormalAI targets: the winning cells, else the blocking cells, else 0"""
+    index = np.arange(1 << 2 * CELL_COUNT)
+    swapped = (index & FULL_MASK) << CELL_COUNT | index >> CELL_COUNT
+    return np.where(COMPLETING != 0, COMPLETING, COMPLETING[swapped])
+
+
+NORMAL = _normal_cells()
+_POW3 = np.array(solver.POW3, np.int32)
+_perfect_moves = None
+
+
+def _random_cells(allowed: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """Picks a uniformly random set bit of every mask"""
+    picks = (rng.random(len(allowed)) * POPCOUNT[allowed]).astype(np.int64)
+    return NTH_CELL[allowed, picks]
+
+
+def easy_policy(mine: np.ndarray, theirs: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """EasyAI: a random empty cell"""
+    return _random_cells(FULL_MASK ^ (mine | theirs), rng)
+
+
+def normal_policy(mine: np.ndarray, theirs: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """NormalAI: a random winning cell if there is one, otherwise a random blocking cell or empty cell"""
+    allowed = NORMAL[mine.astype(np.int64) << CELL_COUNT | theirs]
+    fallback = allowed == 0
+    allowed[fallback] = FULL_MASK ^ (mine[fallback] | theirs[fallback])
+    return _random_cells(allowed, rng)
+
+
+def hard_policy(mine: np.ndarray, theirs: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """A random optimal move from the solved perfect-play table (HardAI without its scripted openings)"""
+    global _perfect_moves
+    if _perfect_moves is None:
+        entries = solver.read_table() if os.path.exists(solver.DEFAULT_TABLE_PATH) else solver.build_table()
+        table = np.array(entries, np.int32)
+        _perfect_moves = (table & FULL_MASK).astype(np.int16)
+    return _random_cells(_perfect_moves[_POW3[mine] + 2 * _POW3[theirs]], rng)
+
+
+POLICIES = {
+    Difficulty.EASY: easy_policy,
+    Difficulty.NORMAL: normal_policy,
+    Difficulty.HARD: hard_policy,
+}
+
+
+class BatchResult:
+    """Aggregate outcome of a batch of games"""
+    def __init__(self, x_wins: int, o_wins: int, draws: int, lengths: np.ndarray):
+        self.x_wins = x_wins
+        self.o_wins = o_wins
+        self.draws = draws
+        # lengths[n] is the number of games that ended after n moves
+        self.lengths = lengths
+
+    @property
+    def games(self) -> int:
+        return self.x_wins + self.o_wins + self.draws
+
+    def __repr__(self):
+        return 'BatchResult(x_wins={}, o_wins={}, draws={}, lengths={})'.format(
+            self.x_wins, self.o_wins, self.draws, self.lengths.tolist())
+
+
+def simulate(games: int, x: Difficulty = Difficulty.NORMAL, o: Difficulty = Difficulty.NORMAL,
+             seed: int = None) -> BatchResult:
+    """Plays the given number of games with X moving first, returning the aggregate results"""
+    rng = np.random.default_rng(seed)
+    policies = (POLICIES[x], POLICIES[o])
+    masks = [np.zeros(games, np.int16), np.zeros(games, np.int16)]
+    # 0 while in progress, 1 when X won, 2 when O won
+    winners = np.zeros(games, np.int8)
+    lengths = np.full(games, CELL_COUNT, np.int8)
+    ongoing = np.arange(games)
+
+    for ply in range(CELL_COUNT):
+        side = ply % 2
+        mine = masks[side][ongoing]
+        theirs = masks[1 - side][ongoing]
+        mine |= 1 << policies[side](mine, theirs, rng).astype(np.int16)
+        masks[side][ongoing] = mine
+
+        won = WINS[mine]
+        if won.any():
+            finished = ongoing[won]
+            winners[finished] = side + 1
+            lengths[finished] = ply + 1
+            ongoing = ongoing[~won]
+
+    x_wins = int(np.count_nonzero(winners == 1))
+    o_wins = int(np.count_nonzero(winners == 2))
+    return BatchResult(x_wins, o_wins, games - x_wins - o_wins, np.bincount(lengths, minlength=CELL_COUNT + 1))
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    x_difficulty = Difficulty[sys.argv[2].upper()] if len(sys.argv) > 2 else Difficulty.NORMAL
+    o_difficulty = Difficulty[sys.argv[3].upper()] if len(sys.argv) > 3 else Difficulty.NORMAL
+    seed_value = int(sys.argv[4]) if len(sys.argv) > 4 else None
+
+    started = time.perf_counter()
+    result = simulate(count, x_difficulty, o_difficulty, seed_value)
+    elapsed = time.perf_counter() - started
+    print(result)
+    print('{} games in {:.3f}s ({:.0f} games/s)'.format(count, elapsed, count / elapsed))
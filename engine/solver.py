@@ -0,0 +1,156 @@
+"""
+Offline perfect-play solver
+
+Enumerates every legal position reachable from the empty board with its minimax value, distance to the end of
+the game, and the set of moves that keep that value. The results are written as a compact binary table indexed by
+the base-3 encoding of the board relative to the side to move, so a lookup is a single array read whichever player
+started the game.
+
+Run as a script to regenerate the table used by HardAI:
+    python -m engine.solver [output path]
+"""
+import os
+import sys
+from array import array
+
+from engine.board import WIN_MASKS, FULL_MASK, CELL_COUNT
+
+# value of a position for the side to move
+LOSS = -1
+DRAW = 0
+WIN = 1
+
+TABLE_MAGIC = b'TTT1'
+TABLE_SIZE = 3 ** CELL_COUNT
+DEFAULT_TABLE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                  'players', 'ai', 'data', 'perfectplay.bin')
+
+# each entry is a uint16: bits 0-8 are the optimal move mask, bits 9-10 the value (0 means the position is not
+# reachable, then loss/draw/win), and bits 11-14 the number of plies left with perfect play
+_MOVES_BITS = 0x1ff
+_VALUE_SHIFT = 9
+_DISTANCE_SHIFT = 11
+
+
+def _pow3_table() -> list:
+    """Maps every 9-bit cell mask to the sum of 3^n over its set bits"""
+    table = []
+    for mask in range(1 << CELL_COUNT):
+        total = 0
+        for position in range(CELL_COUNT):
+            if mask >> position & 1:
+                total += 3 ** position
+        table.append(total)
+    return table
+
+
+# base-3 index of a board is POW3[mover] + 2 * POW3[waiting] (0 = empty, 1 = side to move, 2 = other per cell)
+POW3 = _pow3_table()
+
+
+def index_of(mover: int, waiting: int) -> int:
+    """Gets the base-3 table index of the board described by the two player masks"""
+    return POW3[mover] + 2 * POW3[waiting]
+
+
+def _has_line(mask: int) -> bool:
+    for line in WIN_MASKS:
+        if mask & line == line:
+            return True
+    return False
+
+
+def _key(value: int, distance: int) -> tuple:
+    """Orders results from the mover's point of view: win fastest, lose slowest"""
+    return value, -distance if value == WIN else distance
+
+
+def solve() -> dict:
+    """Solves every reachable position, returning {index: (value, distance, optimal move mask)}"""
+    results = {}
+    _solve(0, 0, results)
+    return results
+
+
+def _solve(mover: int, waiting: int, results: dict) -> tuple:
+    """Solves the position where `mover` is the mask of the side to move"""
+    index = index_of(mover, waiting)
+    result = results.get(index)
+    if result is not None:
+        return result
+
+    if _has_line(waiting):
+        result = (LOSS, 0, 0)
+    elif mover | waiting == FULL_MASK:
+        result = (DRAW, 0, 0)
+    else:
+        best = None
+        best_moves = 0
+        free = ~(mover | waiting) & FULL_MASK
+        while free:
+            bit = free & -free
+            free ^= bit
+            value, distance, _ = _solve(waiting, mover | bit, results)
+            value, distance = -value, distance + 1
+            key = _key(value, distance)
+            if best is None or key > best:
+                best = key
+                best_moves = bit
+            elif key == best:
+                best_moves |= bit
+        value = best[0]
+        distance = -best[1] if value == WIN else best[1]
+        result = (value, distance, best_moves)
+
+    results[index] = result
+    return result
+
+
+def build_table(results: dict = None) -> array:
+    """Packs the solved positions into the table layout"""
+    if results is None:
+        results = solve()
+    table = array('H', bytes(2 * TABLE_SIZE))
+    for index, (value, distance, moves) in results.items():
+        table[index] = moves | (value + 2) << _VALUE_SHIFT | distance << _DISTANCE_SHIFT
+    return table
+
+
+def write_table(path: str = DEFAULT_TABLE_PATH, table: array = None):
+    """Writes the table as the magic header followed by little-endian uint16 entries"""
+    if table is None:
+        table = build_table()
+    if sys.byteorder != 'little':
+        table = array('H', table)
+        table.byteswap()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as file:
+        file.write(TABLE_MAGIC)
+        table.tofile(file)
+
+
+def read_table(path: str = DEFAULT_TABLE_PATH) -> array:
+    """Reads a table written by write_table"""
+    with open(path, 'rb') as file:
+        if file.read(len(TABLE_MAGIC)) != TABLE_MAGIC:
+            raise ValueError('Not a perfect play table: ' + path)
+        table = array('H')
+        table.fromfile(file, TABLE_SIZE)
+    if sys.byteorder != 'little':
+        table.byteswap()
+    return table
+
+
+def unpack(entry: int) -> tuple:
+    """Splits a table entry into (value, distance, optimal move mask); value is None for unreachable positions"""
+    value = (entry >> _VALUE_SHIFT & 0x3) - 2
+    if value < LOSS:
+        return None, 0, 0
+    return value, entry >> _DISTANCE_SHIFT & 0xf, entry & _MOVES_BITS
+
+
+if __name__ == '__main__':
+    output = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_TABLE_PATH
+    solved = solve()
+    write_table(output, build_table(solved))
+    print('Solved {} positions, wrote {}'.format(len(solved), output))
@@ -0,0 +1,68 @@
+"""
+Threat lookup table for the classic board
+
+Every 3x3 board is numbered by its base-3 encoding (0 to 19682, X as 1 and O as 2 in each cell's digit, like the
+solved table), and the table holds the cells that would complete a line for each player in that position: bits 0-8
+for X and bits 9-17 for O. Finding a win or a block is then one indexed read, and every completing cell is known, not
+just the first one found.
+"""
+import random
+from array import array
+
+from constants.playertoken import PlayerToken
+from engine.board import CELL_COUNT, WIN_MASKS
+from engine.solver import POW3, TABLE_SIZE
+
+# every cell mask -> the cells in it, for picking one at random
+MASK_CELLS = tuple(tuple(cell for cell in range(CELL_COUNT) if mask >> cell & 1) for mask in range(1 << CELL_COUNT))
+
+_table = None
+
+
+def get_table() -> array:
+    """Builds the table the first time it's needed (it takes a couple of hundredths of a second)"""
+    global _table
+    if _table is None:
+        _table = build_table()
+    return _table
+
+
+def _completing(mine: int, theirs: int) -> int:
+    """Gets the mask of empty cells that would complete a line for the `mine` player"""
+    cells = 0
+    for line in WIN_MASKS:
+        if not theirs & line:
+            missing = line & ~mine
+            if missing and not missing & missing - 1:
+                cells |= missing
+    return cells
+
+
+def build_table() -> array:
+    """Fills in the completing cells of every board, including ones that can't come up in a game"""
+    table = array('I', bytes(4 * TABLE_SIZE))
+    for x in range(1 << CELL_COUNT):
+        free = ~x & (1 << CELL_COUNT) - 1
+        # every subset of the cells X doesn't hold, counting down to the empty set
+        o = free
+        while True:
+            table[POW3[x] + 2 * POW3[o]] = _completing(x, o) | _completing(o, x) << CELL_COUNT
+            if not o:
+                break
+            o = o - 1 & free
+    return table
+
+
+def completing_cells(board, token: PlayerToken) -> int:
+    """Gets the mask of cells that would complete a line for the token on a classic board"""
+    entry = (_table or get_table())[POW3[board.x] + 2 * POW3[board.o]]
+    return entry & 0x1ff if token == PlayerToken.X else entry >> CELL_COUNT
+
+
+def random_completing_cell(board, token: PlayerToken) -> int:
+    """Picks one of the cells that would complete a line for the token at random, or -1 if there are none"""
+    cells = completing_cells(board, token)
+    if not cells & cells - 1:
+        # none, or just the one
+        return cells.bit_length() - 1
+    return random.choice(MASK_CELLS[cells])
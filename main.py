@@ -1,4 +1,16 @@
-"""A simple Tic Tac Toe game that supports one or two players, as well as multiple difficulties of AI"""
+"""A simple Tic Tac Toe game that supports one or two players, as well as multiple difficulties of AI
+
+    python main.py                                   starts the game
+    python main.py --headless [--x hard] [--o easy] [--games 1000] [--size CLASSIC] [--metrics metrics.json]
+                   [--profile session.prof] [--record games.ttt]
+                                                     plays AI-vs-AI games on the engine without loading Kivy
+
+Set TICTACTOE_METRICS to a file name to collect metrics while playing the game, they are written out on exit, and
+TICTACTOE_RECORD to a file name to append every finished game to it (see engine.gamerecord).
+"""
+import argparse
+import os
+import sys
 
 # TODO: figure out if there's a good way to automatically strip out debug code for python, for now comment out in push
 # debug only
@@ -8,42 +20,113 @@
 # from screens.game import Game
 
 
-from kivy.app import App
-from kivy.uix.screenmanager import ScreenManager
-from kivy.properties import ObjectProperty
-from kivy.config import Config
-# For now, don't allow resize to simplify layouts. Later we'll fix this to be responsive.
-Config.set('graphics', 'resizable', False)
-# TODO: Test on different resolutions. Playing with it, it looks alright at phone resolutions but double check.
-# Config.set('graphics', 'fullscreen', True);
+def run_app():
+    """Starts the Kivy app. Kivy is only imported here, so the headless mode never pays for it"""
+    from kivy.app import App
+    from kivy.uix.screenmanager import ScreenManager
+    from kivy.properties import ObjectProperty
+    from kivy.config import Config
+    # For now, don't allow resize to simplify layouts. Later we'll fix this to be responsive.
+    Config.set('graphics', 'resizable', False)
+    # TODO: Test on different resolutions. Playing with it, it looks alright at phone resolutions but double check.
+    # Config.set('graphics', 'fullscreen', True);
+
+    class TicTacToeScreenManager(ScreenManager):
+        """Enables easy transitions between the different screens of the game"""
+        screen_player_select = ObjectProperty(None)
+        screen_board_select = ObjectProperty(None)
+        screen_difficulty_select = ObjectProperty(None)
+        screen_game = ObjectProperty(None)
+
+        # debug only, jump straight to game screen with options selected
+        # def debug(self, game: Game, player_mode: GameMode = GameMode.ONE_PLAYER,
+        #           difficulty: Difficulty = Difficulty.EASY):
+        #     game.set_difficulty(difficulty)
+        #     game.mode = player_mode
+        #     self.screen_game = game
+        #     self.current = Screen.GAME.value
+
+    class TicTacToeApp(App):
+        """The entry point for the Tic Tac Toe game"""
+        # debug only
+        # def build(self):
+        #     manager = TicTacToeScreenManager()
+        #     manager.debug(manager.screen_game, GameMode.ONE_PLAYER, Difficulty.HARD)
+        #     return manager
+
+        # release
+        def build(self):
+            return TicTacToeScreenManager()
 
+        def on_start(self):
+            if record_path:
+                self.root.screen_game.engine.recorder = GameRecordWriter(record_path)
 
-class TicTacToeScreenManager(ScreenManager):
-    """Enables easy transitions between the different screens of the game"""
-    screen_player_select = ObjectProperty(None)
-    screen_difficulty_select = ObjectProperty(None)
-    screen_game = ObjectProperty(None)
+        def on_stop(self):
+            if metrics_path:
+                metrics.dump_json(metrics_path)
+            if record_path:
+                self.root.screen_game.engine.recorder.close()
 
-    # debug only, jump straight to game screen with options selected
-    # def debug(self, game: Game, player_mode: GameMode = GameMode.ONE_PLAYER, difficulty: Difficulty = Difficulty.EASY):
-    #     game.set_difficulty(difficulty)
-    #     game.mode = player_mode
-    #     self.screen_game = game
-    #     self.current = Screen.GAME.value
+    metrics_path = os.environ.get('TICTACTOE_METRICS')
+    if metrics_path:
+        from engine import metrics
+        metrics.enable()
+    record_path = os.environ.get('TICTACTOE_RECORD')
+    if record_path:
+        from engine.gamerecord import GameRecordWriter
+    TicTacToeApp().run()
+
+
+def run_headless(args: list) -> int:
+    """Plays AI-vs-AI games on the Kivy-free engine and prints the results"""
+    from constants.boardsize import BoardSize
+    from constants.playertoken import PlayerToken
+    from engine import metrics
+    from engine.gameengine import GameEngine, play
+    from players.ai.registry import ENGINES, load_engine
 
+    parser = argparse.ArgumentParser(description='Plays AI-vs-AI games without the UI')
+    parser.add_argument('--headless', action='store_true')
+    parser.add_argument('--x', choices=sorted(ENGINES), default='hard')
+    parser.add_argument('--o', choices=sorted(ENGINES), default='normal')
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--size', choices=[size.name for size in BoardSize], default=BoardSize.CLASSIC.name)
+    parser.add_argument('--metrics', help='write move, thinking and rules timings to this JSON file')
+    parser.add_argument('--profile', help='write a cProfile capture of the games to this file')
+    parser.add_argument('--record', help='append the games to this record file')
+    options = parser.parse_args(args)
 
-class TicTacToeApp(App):
-    """The entry point for the Tic Tac Toe game"""
-    # debug only
-    # def build(self):
-    #     manager = TicTacToeScreenManager()
-    #     manager.debug(manager.screen_game, GameMode.ONE_PLAYER, Difficulty.HARD)
-    #     return manager
+    if options.metrics:
+        metrics.enable()
+    if options.profile:
+        metrics.start_profiling()
 
-    # release
-    def build(self):
-        return TicTacToeScreenManager()
+    engine = GameEngine(PlayerToken.X, *BoardSize[options.size].value)
+    x_player = load_engine(options.x)(engine, PlayerToken.X)
+    o_player = load_engine(options.o)(engine, PlayerToken.O)
+    if options.record:
+        from engine.gamerecord import GameRecordWriter
+        engine.recorder = GameRecordWriter(options.record)
+    results = {}
+    for _ in range(options.games):
+        engine.reset()
+        result = play(engine, x_player, o_player)
+        results[result] = results.get(result, 0) + 1
+
+    if options.profile:
+        metrics.stop_profiling(options.profile)
+    if options.metrics:
+        metrics.dump_json(options.metrics)
+    if options.record:
+        engine.recorder.close()
+
+    for result, count in sorted(results.items(), key=lambda item: item[0].value):
+        print('{}: {}'.format(result.value, count))
+    return 0
 
 
 if __name__ == '__main__':
-    TicTacToeApp().run()
+    if '--headless' in sys.argv[1:]:
+        sys.exit(run_headless(sys.argv[1:]))
+    run_app()
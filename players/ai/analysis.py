@@ -0,0 +1,171 @@
+"""
+Whole-board move analysis
+
+Scores every empty cell of a position in one call: the result the player to move gets by playing there (win, draw
+or loss with perfect play from both sides) and how many plies the game lasts from that move on. Used for hints and
+for reviewing the mistakes of a finished game.
+
+The classic board is answered from the solved table. Other boards are solved exactly with a memoized search, which
+is only practical near the end of a game, so they're limited to MAX_SEARCH_EMPTY empty cells: at the limit, a 5x5
+position can take half a second and solve some 70,000 positions. Results are kept per position in bounded
+least-recently-used caches shared between every caller.
+"""
+from collections import OrderedDict, namedtuple
+
+from constants.playertoken import PlayerToken
+from engine import solver
+from engine.board import CLASSIC_LAYOUT
+from players.ai import perfectplay
+
+# results of a move for the player making it
+LOSS = solver.LOSS
+DRAW = solver.DRAW
+WIN = solver.WIN
+
+# boards other than the classic one are only solved with at most this many empty cells (each one more multiplies
+# the time and the positions solved by up to the number of empty cells)
+MAX_SEARCH_EMPTY = 12
+
+# default cache sizes: whole-board analyses, and solved positions (enough for a search at MAX_SEARCH_EMPTY)
+ANALYSIS_CAPACITY = 1 << 12
+SOLVED_CAPACITY = 1 << 18
+
+MoveAnalysis = namedtuple('MoveAnalysis', 'value distance')
+Mistake = namedtuple('Mistake', 'ply token move value best_value')
+
+_evaluator = None
+
+
+def get_evaluator() -> 'Evaluator':
+    """Gets the evaluator shared by every caller, so its cache is too"""
+    global _evaluator
+    if _evaluator is None:
+        _evaluator = Evaluator()
+    return _evaluator
+
+
+def _key(result: tuple) -> tuple:
+    """Orders results from the mover's point of view: win fastest, lose slowest"""
+    value, distance = result
+    return value, -distance if value == WIN else distance
+
+
+class Evaluator:
+    """Memoized perfect-play evaluation of positions, evicting the least recently used results when a cache is full"""
+    def __init__(self, analysis_capacity: int = ANALYSIS_CAPACITY, solved_capacity: int = SOLVED_CAPACITY):
+        self.analysis_capacity = analysis_capacity
+        self.solved_capacity = solved_capacity
+        # (layout, Zobrist hash, token to move) -> per-cell analysis, and (layout, mover mask, waiting mask) ->
+        # (value, distance) of the positions solved along the way
+        self._analyses = OrderedDict()
+        self._solved = OrderedDict()
+
+    def analyze(self, board, token: PlayerToken) -> list:
+        """Gets a MoveAnalysis for every cell with the token to move (None for filled cells, and every cell once the
+        game is won)"""
+        opponent = PlayerToken.O if token == PlayerToken.X else PlayerToken.X
+        layout = board.layout
+        mover = board.mask(token)
+        waiting = board.mask(opponent)
+        key = (layout, board.hash, token)
+        analysis = self._analyses.get(key)
+        if analysis is not None:
+            self._analyses.move_to_end(key)
+            return analysis
+
+        if board.winner() is not None:
+            analysis = [None] * layout.cells
+        elif layout is not CLASSIC_LAYOUT and board.free_count() > MAX_SEARCH_EMPTY:
+            raise ValueError('Only positions with up to {} empty cells can be analyzed on this board'.format(
+                MAX_SEARCH_EMPTY))
+        else:
+            occupied = mover | waiting
+            analysis = []
+            for position in range(layout.cells):
+                if occupied >> position & 1:
+                    analysis.append(None)
+                else:
+                    analysis.append(MoveAnalysis(*self._move_result(layout, mover, waiting, position)))
+        self._analyses[key] = analysis
+        if len(self._analyses) > self.analysis_capacity:
+            self._analyses.popitem(last=False)
+        return analysis
+
+    def best_moves(self, board, token: PlayerToken) -> list:
+        """Gets every cell that keeps the best result for the token to move"""
+        analysis = self.analyze(board, token)
+        results = [(_key(result), position) for position, result in enumerate(analysis) if result is not None]
+        if not results:
+            return []
+        best = max(results)[0]
+        return [position for key, position in results if key == best]
+
+    def _move_result(self, layout, mover: int, waiting: int, position: int) -> tuple:
+        """Gets (value, distance) of playing the cell for the player whose marks are `mover`"""
+        placed = mover | 1 << position
+        for line in layout.cell_lines[position]:
+            mask = layout.line_masks[line]
+            if placed & mask == mask:
+                return WIN, 1
+        if placed | waiting == layout.full_mask:
+            return DRAW, 1
+
+        value, distance = self._solve(layout, waiting, placed)
+        return -value, distance + 1
+
+    def _solve(self, layout, mover: int, waiting: int) -> tuple:
+        """Gets (value, distance) of an unfinished position for the side to move"""
+        if layout is CLASSIC_LAYOUT:
+            value, distance, _ = perfectplay.get_table().lookup_masks(mover, waiting)
+            # positions that can't come up in a game (e.g. the wrong side to move) aren't in the table
+            if value is not None:
+                return value, distance
+
+        key = (layout, mover, waiting)
+        result = self._solved.get(key)
+        if result is not None:
+            self._solved.move_to_end(key)
+        else:
+            free = ~(mover | waiting) & layout.full_mask
+            while free:
+                bit = free & -free
+                free ^= bit
+                move_result = self._move_result(layout, mover, waiting, bit.bit_length() - 1)
+                if result is None or _key(move_result) > _key(result):
+                    result = move_result
+            self._solved[key] = result
+            if len(self._solved) > self.solved_capacity:
+                self._solved.popitem(last=False)
+        return result
+
+    def review(self, moves: list, first_player: PlayerToken = PlayerToken.X, rows: int = 3, cols: int = 3,
+               win_length: int = 3) -> list:
+        """Gets a Mistake for every move of a game that made its player's result worse
+
+        Moves after the one that ends the game are ignored
+        """
+        from engine.gameengine import GameEngine
+        engine = GameEngine(first_player, rows, cols, win_length)
+        mistakes = []
+        for ply, move in enumerate(moves):
+            token = engine.current_player
+            analysis = self.analyze(engine.board, token)
+            best_value = max(result.value for result in analysis if result is not None)
+            if analysis[move].value < best_value:
+                mistakes.append(Mistake(ply, token, move, analysis[move].value, best_value))
+            if engine.apply_move(move) is not None:
+                break
+        return mistakes
+
+    def __len__(self):
+        return len(self._analyses) + len(self._solved)
+
+    def clear(self):
+        """Forgets every cached result"""
+        self._analyses.clear()
+        self._solved.clear()
+
+
+def analyze(board, token: PlayerToken) -> list:
+    """Gets a MoveAnalysis for every cell with the token to move, using the shared evaluator"""
+    return get_evaluator().analyze(board, token)
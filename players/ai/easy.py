@@ -5,13 +5,15 @@ from constants.playertoken import PlayerToken
 
 class EasyAI(AI):
     """The easy AI is a simple opponent that moves randomly"""
+    __slots__ = ()
+
     def __init__(self, game, token: PlayerToken):
         super().__init__(game, token)
         pass
 
-    def move(self):
+    def choose_target(self) -> int:
         """On easy, the moves are completely random (handled below as a fallback for the other AI's)"""
         self.thinking = True
         target = -1
         # This falls through to the default behavior -- choose a random cell
-        super().move(target)
+        return super().choose_target(target)
@@ -0,0 +1,337 @@
+"""
+Monte Carlo tree search AI opponent module
+
+For boards too big to search exhaustively: moves are scored by playing out many games from them rather than by
+looking every line up. Each playout walks down the tree with UCT (the child with the best win rate plus an
+exploration bonus for the rarely tried ones), adds one node, and finishes the game with light random play that still
+takes a win and blocks an immediate loss, like NormalAI. The move played is the one visited most.
+
+With more than one worker the search is root-parallel: every process grows its own tree from the current position,
+and their root statistics are added up. The tree grown in this process is kept between moves, picking up from the
+node of the position reached after the opponent's reply.
+"""
+import math
+import multiprocessing
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from constants.playertoken import PlayerToken
+from engine.board import Board
+from players.ai.base import AI
+
+# boards bigger than this only try cells next to the marks already played, like SearchAI
+NARROW_SEARCH_CELLS = 49
+
+# UCT exploration constant (sqrt 2 in theory, a bit less plays more solidly here)
+DEFAULT_EXPLORATION = 1.2
+
+# how often (in playouts, minus one) the search checks its deadline
+_CHECK_INTERVAL = 15
+
+_pool = None
+_pool_workers = 0
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """Gets the process pool shared by every MCTSAI, sized for the given number of extra workers"""
+    global _pool, _pool_workers
+    if _pool is None or _pool_workers < workers:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        # forked workers would inherit the app's threads and open sockets
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        _pool_workers = workers
+    return _pool
+
+
+class _Node:
+    """A position in the tree, reached by `token` playing `move` from its parent
+
+    wins counts the playout results for that player (a draw is half a win)
+    """
+    __slots__ = ('move', 'token', 'parent', 'children', 'untried', 'visits', 'wins', 'winner')
+
+    def __init__(self, move: int, token: PlayerToken, parent: '_Node'):
+        self.move = move
+        self.token = token
+        self.parent = parent
+        self.children = {}
+        self.untried = None
+        self.visits = 0
+        self.wins = 0.0
+        # token that won with this move, False for a draw and None if the game goes on
+        self.winner = None
+
+
+class _Tree:
+    """The search tree for one side to move, grown by playouts on a private copy of the board"""
+    def __init__(self, board: Board, token: PlayerToken, exploration: float):
+        self.board = board
+        self.token = token
+        self.exploration = exploration
+        self.root = _Node(-1, None, None)
+        self.playouts = 0
+        # perf_counter time the current run stops at (None for no limit)
+        self.deadline = None
+        layout = board.layout
+        self._neighbours = None
+        if layout.cells > NARROW_SEARCH_CELLS:
+            self._neighbours = []
+            for position in range(layout.cells):
+                row, col = divmod(position, layout.cols)
+                mask = 0
+                for r in range(max(row - 1, 0), min(row + 2, layout.rows)):
+                    for c in range(max(col - 1, 0), min(col + 2, layout.cols)):
+                        mask |= 1 << (r * layout.cols + c)
+                self._neighbours.append(mask)
+
+    def advance(self, moves: list) -> bool:
+        """Moves the root down past the given moves, returning False if they were never expanded"""
+        node = self.root
+        for move in moves:
+            node = node.children.get(move)
+            if node is None:
+                return False
+        for move in moves:
+            self.board.place(move, self.token)
+            self.token = PlayerToken.O if self.token == PlayerToken.X else PlayerToken.X
+        node.parent = None
+        self.root = node
+        return True
+
+    def run(self, playouts: int = None, deadline: float = None, cancelled=None) -> int:
+        """Plays out games until the playout count or the deadline is reached (whichever is set and comes first)
+
+        cancelled, if given, is called at every deadline check and stops the run when it returns True. Returns the
+        number of playouts made
+        """
+        self.deadline = deadline
+        done = 0
+        while playouts is None or done < playouts:
+            if not done & _CHECK_INTERVAL and (self.deadline is not None and time.perf_counter() > self.deadline
+                                               or cancelled is not None and cancelled()):
+                break
+            self._playout()
+            done += 1
+        self.playouts += done
+        return done
+
+    def statistics(self) -> dict:
+        """Gets {move: (visits, wins)} for the root's children"""
+        return {move: (child.visits, child.wins) for move, child in self.root.children.items()}
+
+    def _playout(self):
+        board = self.board
+        token = self.token
+        node = self.root
+        played = []
+
+        # selection: follow UCT down through fully expanded nodes
+        while node.winner is None:
+            if node.untried is None:
+                node.untried = self._candidate_moves(token)
+            if node.untried or not node.children:
+                break
+            node = self._select(node)
+            board.place(node.move, token)
+            played.append((node.move, token))
+            token = PlayerToken.O if token == PlayerToken.X else PlayerToken.X
+
+        # expansion: add one untried move
+        if node.winner is None and node.untried:
+            move = node.untried.pop(random.randrange(len(node.untried)))
+            child = node.children[move] = _Node(move, token, node)
+            if board.place(move, token):
+                child.winner = token
+            elif board.is_full():
+                child.winner = False
+            played.append((move, token))
+            token = PlayerToken.O if token == PlayerToken.X else PlayerToken.X
+            node = child
+
+        # simulation: finish the game with the win/block heuristic
+        winner = node.winner
+        if winner is None:
+            winner = self._rollout(token, played)
+
+        # backpropagation, crediting each node's mover
+        while node is not None:
+            node.visits += 1
+            if winner is False:
+                node.wins += 0.5
+            elif winner == node.token:
+                node.wins += 1
+            node = node.parent
+        for move, mover in reversed(played):
+            board.remove(move, mover)
+
+    def _select(self, node: _Node) -> _Node:
+        """Picks the child with the best UCT score"""
+        scale = self.exploration * math.sqrt(math.log(node.visits))
+        best = None
+        best_score = -1.0
+        for child in node.children.values():
+            score = child.wins / child.visits + scale / math.sqrt(child.visits)
+            if score > best_score:
+                best = child
+                best_score = score
+        return best
+
+    def _candidate_moves(self, token: PlayerToken) -> list:
+        """Gets the moves worth trying: a win or a forced block if there is one, otherwise every (nearby) cell"""
+        board = self.board
+        winning = board.completing_cell(token)
+        if winning != -1:
+            return [winning]
+        blocking = board.completing_cell(PlayerToken.O if token == PlayerToken.X else PlayerToken.X)
+        if blocking != -1:
+            return [blocking]
+
+        if self._neighbours is None:
+            return board.free_cells()
+        occupied = board.occupied
+        if not occupied:
+            layout = board.layout
+            return [(layout.rows // 2) * layout.cols + layout.cols // 2]
+        nearby = 0
+        remaining = occupied
+        while remaining:
+            bit = remaining & -remaining
+            remaining ^= bit
+            nearby |= self._neighbours[bit.bit_length() - 1]
+        nearby &= ~occupied
+        moves = []
+        while nearby:
+            bit = nearby & -nearby
+            nearby ^= bit
+            moves.append(bit.bit_length() - 1)
+        return moves
+
+    def _rollout(self, token: PlayerToken, played: list):
+        """Plays the game out from the board, returning the winning token or False for a draw"""
+        board = self.board
+        while not board.is_full():
+            opponent = PlayerToken.O if token == PlayerToken.X else PlayerToken.X
+            move = board.completing_cell(token)
+            if move == -1:
+                move = board.completing_cell(opponent)
+            if move == -1:
+                move = board.random_free_cell()
+            played.append((move, token))
+            if board.place(move, token):
+                return token
+            token = opponent
+        return False
+
+
+def root_statistics(rows: int, cols: int, win_length: int, x: int, o: int, token: str, playouts: int,
+                    time_budget: float, exploration: float, seed: int) -> dict:
+    """Worker job: grows a fresh tree for the position and returns its root statistics"""
+    random.seed(seed)
+    board = Board(rows, cols, win_length)
+    for position in range(board.cells):
+        if x >> position & 1:
+            board.place(position, PlayerToken.X)
+        elif o >> position & 1:
+            board.place(position, PlayerToken.O)
+    tree = _Tree(board, PlayerToken(token), exploration)
+    tree.run(playouts, None if time_budget is None else time.perf_counter() + time_budget)
+    return tree.statistics()
+
+
+class MCTSAI(AI):
+    """Monte Carlo tree search bounded by a playout budget and/or a time budget per move
+
+    Set either budget to None to only use the other one. playouts is per worker, so extra workers add strength for
+    the same time.
+    """
+    __slots__ = ('playouts', 'time_budget', 'workers', 'exploration', 'playouts_done', '_tree', '_position',
+                 '_cancelled')
+
+    def __init__(self, game, token: PlayerToken, playouts: int = 5000, time_budget: float = 1.0, workers: int = 1,
+                 exploration: float = DEFAULT_EXPLORATION):
+        super().__init__(game, token)
+        if playouts is None and time_budget is None:
+            raise ValueError('MCTSAI needs a playout budget or a time budget')
+        self.playouts = playouts
+        self.time_budget = time_budget
+        self.workers = workers
+        self.exploration = exploration
+        # stats from the last move
+        self.playouts_done = 0
+        # the tree kept from the last move, and the (x, o) masks of the position it was grown for
+        self._tree = None
+        self._position = None
+        # set by cancel() from another thread, checked along with the deadline
+        self._cancelled = False
+
+    def choose_target(self) -> int:
+        """Plays out games from the current position until a budget runs out"""
+        self.thinking = True
+        return super().choose_target(self.search())
+
+    def cancel(self):
+        """Ends a search running on another thread at its next deadline check, or one about to start"""
+        self._cancelled = True
+
+    def resume(self):
+        self._cancelled = False
+
+    def search(self) -> int:
+        """Finds the most visited move for the current position"""
+        board = self.game.board
+        if board.is_full():
+            return -1
+        tree = self._reuse_tree(board)
+        deadline = None if self.time_budget is None else time.perf_counter() + self.time_budget
+
+        futures = []
+        if self.workers > 1 and not self._cancelled:
+            pool = _get_pool(self.workers - 1)
+            layout = board.layout
+            futures = [pool.submit(root_statistics, layout.rows, layout.cols, layout.win_length, board.x, board.o,
+                                   self.token.value, self.playouts, self.time_budget, self.exploration,
+                                   random.getrandbits(64))
+                       for _ in range(self.workers - 1)]
+
+        # the playouts a reused tree already had for this position come on top of the budget
+        self.playouts_done = tree.run(self.playouts, deadline, lambda: self._cancelled)
+        if self._cancelled:
+            # the move won't be played, so don't wait for the workers
+            for future in futures:
+                future.cancel()
+            futures = []
+
+        totals = {move: visits for move, (visits, _) in tree.statistics().items()}
+        for future in futures:
+            for move, (visits, _) in future.result().items():
+                totals[move] = totals.get(move, 0) + visits
+                self.playouts_done += visits
+        if not totals:
+            return -1
+        return max(totals, key=totals.get)
+
+    def _reuse_tree(self, board: Board) -> _Tree:
+        """Gets the kept tree moved down to the current position, or a new one if it doesn't lead here"""
+        tree = self._tree
+        if tree is not None and tree.board.layout is board.layout:
+            x, o = self._position
+            if board.x == x and board.o == o:
+                return tree
+            # since the last search we've played one cell and the opponent one
+            mine, theirs = board.x & ~x, board.o & ~o
+            if self.token == PlayerToken.O:
+                mine, theirs = theirs, mine
+            if board.x & x == x and board.o & o == o and _single_bit(mine) and _single_bit(theirs) \
+                    and tree.advance([mine.bit_length() - 1, theirs.bit_length() - 1]):
+                self._position = (board.x, board.o)
+                return tree
+
+        self._tree = _Tree(board.copy(), self.token, self.exploration)
+        self._position = (board.x, board.o)
+        return self._tree
+
+
+def _single_bit(mask: int) -> bool:
+    return mask != 0 and mask & (mask - 1) == 0
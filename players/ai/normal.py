@@ -5,10 +5,12 @@ from constants.playertoken import PlayerToken
 
 class NormalAI(AI):
     """THe Normal AI is a standard opponent that should behave like an average human player"""
+    __slots__ = ()
+
     def __init__(self, game, token: PlayerToken):
         super().__init__(game, token)
 
-    def move(self):
+    def choose_target(self) -> int:
         """On normal, the moves are mostly random, but the opponent will block you from completing 3"""
         self.thinking = True
 
@@ -20,4 +22,4 @@ class NormalAI(AI):
             target = self.get_blocking_target()
 
         # if a target isn't found, the base falls back to choosing randomly
-        super().move(target)
+        return super().choose_target(target)
@@ -0,0 +1,89 @@
+"""Memory-mapped opening book lookups for the AI"""
+import mmap
+import os
+import random
+import sys
+from array import array
+from bisect import bisect_left
+
+from constants.playertoken import PlayerToken
+from engine import bookbuilder
+from engine.board import CELL_COUNT
+
+_book = None
+
+
+def get_book() -> 'OpeningBook':
+    """Opens the book once and shares it between every AI"""
+    global _book
+    if _book is None:
+        _book = OpeningBook.open()
+    return _book
+
+
+class OpeningBook:
+    """Binary search over the sorted canonical keys written by the book builder
+
+    The file is mapped read-only, so there is nothing to parse on startup and every process opening it shares the
+    same pages
+    """
+    def __init__(self, buffer):
+        self._buffer = buffer
+        magic, count, self.max_marks = bookbuilder.BOOK_HEADER.unpack_from(buffer)
+        if magic != bookbuilder.BOOK_MAGIC:
+            raise ValueError('Not an opening book')
+        start = bookbuilder.BOOK_HEADER.size
+        if sys.byteorder == 'little':
+            self._keys = memoryview(buffer)[start:start + 4 * count].cast('I')
+        else:
+            self._keys = array('I', buffer[start:start + 4 * count])
+            self._keys.byteswap()
+        self._weights = start + 4 * count
+        # positions already looked up by Zobrist hash and side to move, as played (the book only has a few hundred)
+        self._found = {}
+
+    @classmethod
+    def open(cls, path: str = bookbuilder.DEFAULT_BOOK_PATH) -> 'OpeningBook':
+        """Maps the book file, building it in memory if it hasn't been generated"""
+        if not os.path.exists(path):
+            return cls(bookbuilder.pack_book(bookbuilder.build_book()))
+        with open(path, 'rb') as file:
+            return cls(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def __len__(self):
+        return len(self._keys)
+
+    def weights(self, board, token: PlayerToken) -> tuple:
+        """Gets the weight of every cell with the token to move, or None if the position isn't in the book"""
+        entry = self._entry(board, token)
+        return entry[0] if entry else None
+
+    def choose(self, board, token: PlayerToken, variety: bool = True) -> int:
+        """Picks a book move, weighted at random with variety on and the heaviest otherwise (-1 if out of book)"""
+        entry = self._entry(board, token)
+        if entry is None:
+            return -1
+        return random.choice(entry[1]) if variety else entry[2]
+
+    def _entry(self, board, token: PlayerToken):
+        """Gets (weights, cells repeated by weight, heaviest cell) for the position, or None if it's not in the book"""
+        if board.move_count() > self.max_marks:
+            return None
+        found = (board.hash, token)
+        if found in self._found:
+            return self._found[found]
+
+        opponent = PlayerToken.O if token == PlayerToken.X else PlayerToken.X
+        entry = None
+        key, symmetry = bookbuilder.canonical(board.mask(token), board.mask(opponent))
+        index = bisect_left(self._keys, key)
+        if index < len(self._keys) and self._keys[index] == key:
+            offset = self._weights + index * CELL_COUNT
+            stored = self._buffer[offset:offset + CELL_COUNT]
+            mapping = bookbuilder.MAPPINGS[symmetry]
+            weights = tuple(stored[mapping[cell]] for cell in range(CELL_COUNT))
+            if any(weights):
+                cells = tuple(cell for cell in range(CELL_COUNT) for _ in range(weights[cell]))
+                entry = (weights, cells, weights.index(max(weights)))
+        self._found[found] = entry
+        return entry
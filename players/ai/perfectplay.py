@@ -0,0 +1,42 @@
+"""Precomputed perfect-play table lookups for the AI"""
+import os
+
+from constants.playertoken import PlayerToken
+from engine import solver
+
+_table = None
+
+
+def get_table() -> 'PerfectPlayTable':
+    """Loads the table once and shares it between every AI"""
+    global _table
+    if _table is None:
+        _table = PerfectPlayTable.load()
+    return _table
+
+
+class PerfectPlayTable:
+    """O(1) minimax lookups for any reachable 3x3 position, indexed by the board's base-3 encoding"""
+    def __init__(self, entries):
+        self._entries = entries
+
+    @classmethod
+    def load(cls, path: str = solver.DEFAULT_TABLE_PATH) -> 'PerfectPlayTable':
+        """Reads the table written by the solver, solving in memory if the file hasn't been generated"""
+        if os.path.exists(path):
+            return cls(solver.read_table(path))
+        return cls(solver.build_table())
+
+    def lookup(self, board, token: PlayerToken) -> tuple:
+        """Gets (value, distance, optimal move mask) with the token to move; value is None if unreachable"""
+        opponent = PlayerToken.O if token == PlayerToken.X else PlayerToken.X
+        return self.lookup_masks(board.mask(token), board.mask(opponent))
+
+    def lookup_masks(self, mover: int, waiting: int) -> tuple:
+        """Same as lookup, for the cell masks of the side to move and the other player"""
+        return solver.unpack(self._entries[solver.index_of(mover, waiting)])
+
+    def best_moves(self, board, token: PlayerToken) -> list:
+        """Gets every cell that keeps the best result for the given token to move"""
+        moves = self.lookup(board, token)[2]
+        return [position for position in range(solver.CELL_COUNT) if moves >> position & 1]
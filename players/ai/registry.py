@@ -0,0 +1,37 @@
+"""
+Lazy lookup of the AI classes
+
+Each AI (and any data it loads) is only imported once it's actually picked, so the Game screen and the tools don't
+pay for HardAI's tables or the search engine until someone selects them
+"""
+import importlib
+
+from constants.difficulty import Difficulty
+from engine.board import CLASSIC_LAYOUT
+
+# name -> 'module:class'; add new engines here
+ENGINES = {
+    'easy': 'players.ai.easy:EasyAI',
+    'normal': 'players.ai.normal:NormalAI',
+    'hard': 'players.ai.hard:HardAI',
+    'search': 'players.ai.search:SearchAI',
+    'mcts': 'players.ai.mcts:MCTSAI',
+}
+
+
+def load_engine(name: str):
+    """Imports the AI class registered under the given name"""
+    module, cls = ENGINES[name].split(':')
+    return getattr(importlib.import_module(module), cls)
+
+
+def engine_for(difficulty: Difficulty, layout) -> str:
+    """Gets the name of the engine that plays the given difficulty on a board layout
+
+    HardAI's tables only cover the classic board, larger boards get the search engine
+    """
+    if difficulty == Difficulty.EASY:
+        return 'easy'
+    if difficulty == Difficulty.NORMAL:
+        return 'normal'
+    return 'hard' if layout is CLASSIC_LAYOUT else 'search'
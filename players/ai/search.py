@@ -0,0 +1,264 @@
+"""Search-based AI opponent module"""
+import time
+
+from constants.playertoken import PlayerToken
+from players.ai.base import AI
+from players.ai.transposition import TranspositionTable, EXACT, LOWER_BOUND, UPPER_BOUND
+
+# scores are relative to the side to move; forced wins count down by one per ply so faster wins score higher
+WIN = 1000000000
+WIN_THRESHOLD = WIN - 10000
+
+# boards bigger than this only consider cells next to the marks already played
+NARROW_SEARCH_CELLS = 49
+
+# how often (in nodes, minus one) the search checks its deadline
+_CHECK_INTERVAL = 1023
+
+
+class _Timeout(Exception):
+    """Raised inside the search when the move's time budget runs out"""
+    pass
+
+
+def _parent_score(child_score: int) -> int:
+    """Converts a child's score to its parent's point of view"""
+    score = -child_score
+    if score > WIN_THRESHOLD:
+        return score - 1
+    if score < -WIN_THRESHOLD:
+        return score + 1
+    return score
+
+
+class SearchAI(AI):
+    """Negamax search with alpha-beta pruning and iterative deepening, bounded by a per-move time budget
+
+    Works on any board size, and always answers with the best move found so far when the deadline hits
+    """
+    __slots__ = ('time_budget', 'max_depth', 'nodes', 'depth_reached', '_table', '_layout', '_neighbours', '_weights',
+                 '_deadline', '_cancelled')
+
+    def __init__(self, game, token: PlayerToken, time_budget: float = 1.0, max_depth: int = None):
+        super().__init__(game, token)
+        self.time_budget = time_budget
+        self.max_depth = max_depth
+        # stats from the last search
+        self.nodes = 0
+        self.depth_reached = 0
+        self._table = None
+        self._layout = None
+        self._neighbours = None
+        self._weights = None
+        self._deadline = 0.0
+        # set by cancel() from another thread, checked along with the deadline
+        self._cancelled = False
+
+    def choose_target(self) -> int:
+        """Searches for the best move until the time budget runs out"""
+        self.thinking = True
+        return super().choose_target(self.search())
+
+    def cancel(self):
+        """Ends a search running on another thread at its next deadline check, or one about to start"""
+        self._cancelled = True
+
+    def resume(self):
+        self._cancelled = False
+
+    def search(self) -> int:
+        """Finds the best move for the current position"""
+        board = self.game.board.copy()
+        self._prepare(board.layout)
+        self._deadline = time.perf_counter() + self.time_budget
+        self.nodes = 0
+        self.depth_reached = 0
+
+        winning = board.completing_cell(self.token)
+        if winning != -1:
+            return winning
+
+        moves = self._ordered_moves(board, self.token, -1)
+        if len(moves) <= 1:
+            return moves[0] if moves else -1
+
+        best_move = moves[0]
+        remaining = board.cells - board.move_count()
+        max_depth = remaining if self.max_depth is None else min(self.max_depth, remaining)
+
+        for depth in range(1, max_depth + 1):
+            alpha = -WIN - 1
+            iteration_move = -1
+            try:
+                for move in moves:
+                    score = self._score_move(board, move, self.token, depth, alpha, WIN + 1)
+                    if score > alpha:
+                        alpha = score
+                        iteration_move = move
+            except _Timeout:
+                # the previous best is searched first, so anything that finished ahead of it is an improvement
+                if iteration_move != -1:
+                    best_move = iteration_move
+                break
+
+            best_move = iteration_move
+            self.depth_reached = depth
+            moves.remove(best_move)
+            moves.insert(0, best_move)
+            if abs(alpha) > WIN_THRESHOLD:
+                break
+
+        return best_move
+
+    def _prepare(self, layout):
+        """Sets up the per-layout tables the first time a board shape is searched"""
+        if layout is self._layout:
+            return
+
+        self._layout = layout
+        symmetric = layout.cells <= NARROW_SEARCH_CELLS
+        self._table = TranspositionTable(layout, symmetric=symmetric)
+
+        # weight of a line holding n marks of one player and none of the other
+        self._weights = [0] + [4 ** count for count in range(1, layout.win_length + 1)]
+
+        self._neighbours = None
+        if layout.cells > NARROW_SEARCH_CELLS:
+            self._neighbours = []
+            for position in range(layout.cells):
+                row, col = divmod(position, layout.cols)
+                mask = 0
+                for r in range(max(row - 1, 0), min(row + 2, layout.rows)):
+                    for c in range(max(col - 1, 0), min(col + 2, layout.cols)):
+                        mask |= 1 << (r * layout.cols + c)
+                self._neighbours.append(mask)
+
+    def _score_move(self, board, move: int, token: PlayerToken, depth: int, alpha: int, beta: int) -> int:
+        """Plays the move on the search board and scores it for the player making it"""
+        if board.place(move, token):
+            score = WIN - 1
+        elif board.is_full():
+            score = 0
+        else:
+            opponent = PlayerToken.O if token == PlayerToken.X else PlayerToken.X
+            score = _parent_score(self._negamax(board, opponent, depth - 1, -beta, -alpha))
+        board.remove(move, token)
+        return score
+
+    def _negamax(self, board, token: PlayerToken, depth: int, alpha: int, beta: int) -> int:
+        """Scores the position for the side to move (the previous move didn't end the game)"""
+        self.nodes += 1
+        if not self.nodes & _CHECK_INTERVAL and (self._cancelled or time.perf_counter() > self._deadline):
+            raise _Timeout()
+
+        if board.completing_cell(token) != -1:
+            return WIN - 1
+        if depth == 0:
+            return self._evaluate(board, token)
+
+        opponent = PlayerToken.O if token == PlayerToken.X else PlayerToken.X
+        original_alpha = alpha
+        first_move = -1
+        entry = self._table.lookup(board, token)
+        if entry is not None:
+            value, entry_depth, flag, first_move = entry
+            if entry_depth >= depth:
+                if flag == EXACT:
+                    return value
+                if flag == LOWER_BOUND:
+                    alpha = max(alpha, value)
+                elif flag == UPPER_BOUND:
+                    beta = min(beta, value)
+                if alpha >= beta:
+                    return value
+
+        best = -WIN - 1
+        best_move = -1
+        for move in self._ordered_moves(board, token, first_move):
+            # no move wins outright here (checked above), so only a full board ends the game
+            board.place(move, token)
+            if board.is_full():
+                score = 0
+            else:
+                score = _parent_score(self._negamax(board, opponent, depth - 1, -beta, -alpha))
+            board.remove(move, token)
+
+            if score > best:
+                best = score
+                best_move = move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                break
+
+        if best <= original_alpha:
+            flag = UPPER_BOUND
+        elif best >= beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        self._table.store(board, token, best, depth, flag, best_move)
+        return best
+
+    def _ordered_moves(self, board, token: PlayerToken, first_move: int) -> list:
+        """Gets the moves worth searching, most promising first
+
+        A threatened win has to be blocked, so that's the only move. Otherwise the cached best move goes first,
+        then cells ordered by how much they add to (or take away from) open lines.
+        """
+        opponent = PlayerToken.O if token == PlayerToken.X else PlayerToken.X
+        blocking = board.completing_cell(opponent)
+        if blocking != -1:
+            return [blocking]
+
+        layout = board.layout
+        occupied = board.occupied
+        if self._neighbours is None:
+            free = ~occupied & layout.full_mask
+        elif occupied:
+            free = 0
+            remaining = occupied
+            while remaining:
+                bit = remaining & -remaining
+                remaining ^= bit
+                free |= self._neighbours[bit.bit_length() - 1]
+            free &= ~occupied
+        else:
+            return [(layout.rows // 2) * layout.cols + layout.cols // 2]
+
+        mine = board.line_counts(token)
+        theirs = board.line_counts(opponent)
+        weights = self._weights
+        scored = []
+        while free:
+            bit = free & -free
+            free ^= bit
+            position = bit.bit_length() - 1
+            score = 0
+            for line in layout.cell_lines[position]:
+                if not theirs[line]:
+                    score += weights[mine[line] + 1]
+                if not mine[line]:
+                    score += weights[theirs[line] + 1]
+            scored.append((score, position))
+        scored.sort(reverse=True)
+
+        moves = [position for _, position in scored]
+        if first_move != -1 and first_move in moves:
+            moves.remove(first_move)
+            moves.insert(0, first_move)
+        return moves
+
+    def _evaluate(self, board, token: PlayerToken) -> int:
+        """Heuristic score at the search horizon: open lines weighted by how full they are"""
+        opponent = PlayerToken.O if token == PlayerToken.X else PlayerToken.X
+        mine = board.line_counts(token)
+        theirs = board.line_counts(opponent)
+        weights = self._weights
+        score = 0
+        for line in range(len(mine)):
+            if not theirs[line]:
+                score += weights[mine[line]]
+            elif not mine[line]:
+                score -= weights[theirs[line]]
+        return score
@@ -0,0 +1,80 @@
+"""
+Symmetry-aware transposition table for game-tree search
+
+Positions are keyed by the board's Zobrist hash, plus the side to move. Boards that only differ by a rotation or
+reflection share a single entry: the key is the layout's symmetric hash (the smallest hash across the board's
+symmetries), and moves are stored relative to the symmetry that gave it, so a search only evaluates one position per
+symmetry class
+"""
+from collections import OrderedDict
+
+from constants.playertoken import PlayerToken
+from engine.board import symmetries
+
+# bound types for alpha-beta results
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+
+class TranspositionTable:
+    """Bounded least-recently-used cache of search results keyed by canonical position
+
+    With symmetric off, positions are keyed by the board's incremental hash as they are (no per-lookup work at all,
+    for boards too big to search deeply)
+    """
+    def __init__(self, layout, capacity: int = 1 << 16, symmetric: bool = True):
+        self.layout = layout
+        self.capacity = capacity
+        self.symmetric = symmetric
+        self.hits = 0
+        self.misses = 0
+        mappings = symmetries(layout.rows, layout.cols) if symmetric else symmetries(layout.rows, layout.cols)[:1]
+        self._mappings = mappings
+        self._inverses = [tuple(sorted(range(layout.cells), key=mapping.__getitem__)) for mapping in mappings]
+        self._entries = OrderedDict()
+
+    def key(self, board, token: PlayerToken) -> tuple:
+        """Gets the (key, symmetry) of the position with the token to move"""
+        if self.symmetric:
+            value, symmetry = self.layout.symmetric_hash(board.x, board.o)
+        else:
+            value, symmetry = board.hash, 0
+        return value << 1 | (token == PlayerToken.O), symmetry
+
+    def lookup(self, board, token: PlayerToken):
+        """Gets the cached (value, depth, flag, move) for the position with the token to move, or None
+
+        The move is translated back from the canonical form to the position's own orientation
+        """
+        key, symmetry = self.key(board, token)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(key)
+        value, depth, flag, move = entry
+        if move != -1:
+            move = self._inverses[symmetry][move]
+        return value, depth, flag, move
+
+    def store(self, board, token: PlayerToken, value: int, depth: int = 0, flag: int = EXACT, move: int = -1):
+        """Caches a search result for the position, evicting the least recently used entry when full"""
+        key, symmetry = self.key(board, token)
+        if move != -1:
+            move = self._mappings[symmetry][move]
+        self._entries[key] = (value, depth, flag, move)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Empties the table and its statistics"""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
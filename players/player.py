@@ -1,14 +1,27 @@
 """Base Player module (for human and AI players)"""
 from constants.playertoken import PlayerToken
+from engine import metrics
+
+# methods timed by the metrics collector when it's enabled, with the names they're reported under
+_TRACKED = (('move', 'move'), ('choose_target', 'thinking'), ('get_completing_target', 'get_completing_target'))
 
 
 class Player:
     """Base class for data and behavior common between all players"""
+    # no per-instance dict, since a server can hold a lot of these
+    __slots__ = ('thinking', 'game', 'token')
+
     def __init__(self, game, token: PlayerToken):
         self.thinking = False
         self.game = game
         self.token = token
 
+    def __init_subclass__(cls, **kwargs):
+        """Registers the subclass's own overrides of the tracked methods with the metrics collector"""
+        super().__init_subclass__(**kwargs)
+        for attribute, metric in _TRACKED:
+            metrics.track(cls, attribute, metric)
+
     def select_target(self, position: int):
         """selects a cell on the game board using the player's token"""
         self.game.fill_cell(position, self.token)
@@ -16,3 +29,22 @@ class Player:
     def move(self):
         """"""
         pass
+
+    def choose_target(self) -> int:
+        """Picks the cell to play without playing it (-1 for players that choose through the UI)"""
+        return -1
+
+    def cancel(self):
+        """Asks a move being chosen in the background to wrap up early (its result will be ignored)
+
+        Sticks until resume() is called, so it also stops a move that starts after it
+        """
+        pass
+
+    def resume(self):
+        """Clears a cancel before the next move is requested"""
+        pass
+
+
+for _attribute, _metric in _TRACKED:
+    metrics.track(Player, _attribute, _metric)
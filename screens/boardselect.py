@@ -0,0 +1,6 @@
+from kivy.uix.screenmanager import Screen
+
+
+class BoardSelect(Screen):
+    """Simple board size select screen, button logic handled in kv file"""
+    pass
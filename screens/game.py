@@ -3,16 +3,23 @@ Module for the main game logic
 
 Handles the main game loop including turn order, AI, and end conditions
 """
+from concurrent.futures import ThreadPoolExecutor
+
+from kivy.clock import mainthread
+from kivy.logger import Logger
 from kivy.uix.screenmanager import Screen
 from kivy.properties import ObjectProperty, ListProperty
 
+from constants.boardsize import BoardSize
 from constants.difficulty import Difficulty
 from constants.playertoken import PlayerToken
 from constants.gamemode import GameMode
+from constants.gameresult import GameResult
+
+from engine import metrics
+from engine.gameengine import GameEngine
 
-from players.ai.easy import EasyAI
-from players.ai.normal import NormalAI
-from players.ai.hard import HardAI
+from players.ai.registry import engine_for, load_engine
 from players.player import Player
 
 
@@ -34,17 +41,62 @@ class Game(Screen):
         self._player_two = Player(self, PlayerToken.O)
         self._current_player = self._player_one
         self._allow_move = True
-        self.grid_size = 3
+        # AI moves are chosen on a worker thread so the UI keeps running while it thinks; the generation is bumped
+        # on every reset so a move that finishes for an old game gets dropped
+        self._ai_executor = ThreadPoolExecutor(max_workers=1)
+        self._ai_move = None
+        self._generation = 0
+        # the rules live in a Kivy-free engine, state mirrors it for the bindings
+        self.engine = GameEngine(self._current_player.token)
+        self.grid_size = self.engine.grid_size
+
+    def on_kv_post(self, base_widget):
+        """Sizes the board once the kv rule has added it (as a child of the screen manager's rule, the Game rule
+        is only applied after __init__, so ids is still empty there)"""
+        self.build_grid()
+
+    @property
+    def board(self):
+        """The engine's bitboard, used for the end condition checks and by the AI"""
+        return self.engine.board
+
+    @property
+    def rows(self) -> int:
+        return self.engine.rows
+
+    @property
+    def cols(self) -> int:
+        return self.engine.cols
+
+    def set_board_size(self, size: BoardSize):
+        """Starts over on a board of the given size"""
+        rows, cols, win_length = size.value
+        self.cancel_ai_move()
+        recorder = self.engine.recorder
+        self.engine = GameEngine(self._current_player.token, rows, cols, win_length)
+        self.engine.recorder = recorder
+        self.grid_size = self.engine.grid_size
+        self.state = [''] * self.engine.board.cells
+        self.build_grid()
+
+    def build_grid(self):
+        """Sizes the board view for the engine's board (it draws every cell itself, so there's nothing to build)"""
+        self.ids.board.set_shape(self.engine.rows, self.engine.cols)
+        self.on_state(self, self.state)
+
+    def on_state(self, instance, value):
+        """Keeps the board view in sync with the state (it only redraws the cells that changed)"""
+        # on_state can fire before the kv rules have added the board
+        board = self.ids.get('board')
+        if board is not None and len(value) == board.cells:
+            board.show(value)
 
     def set_difficulty(self, difficulty: Difficulty):
         token = self._player_two.token
         """sets up an AI of the given difficulty"""
-        if difficulty == Difficulty.EASY:
-            self._player_two = EasyAI(self, token)
-        if difficulty == Difficulty.NORMAL:
-            self._player_two = NormalAI(self, token)
-        if difficulty == Difficulty.HARD:
-            self._player_two = HardAI(self, token)
+        self.cancel_ai_move()
+        # the AI modules are only imported once picked, so HardAI's tables don't slow down startup
+        self._player_two = load_engine(engine_for(difficulty, self.board.layout))(self, token)
 
     def select_cell(self, position: int):
         """Selects a cell using the current player's token"""
@@ -56,22 +108,53 @@ class Game(Screen):
 
     def fill_cell(self, position: int, token: PlayerToken):
         """Selects a cell using the given token"""
+        self.engine.fill_cell(position, token)
         self.state[position] = token.value
         self.check_end_conditions()
         self.switch_player()
 
     def player_moved(self):
-        """Called when a player moves to progress the game"""
-        self._allow_move = False
+        """Called when a player moves to progress the game, hands the turn over to the AI when it's up"""
+        # the kv file calls this again on release, so ignore it while the AI is already on it
+        if self.mode != GameMode.ONE_PLAYER or self._current_player is not self._player_two \
+                or self._ai_move is not None:
+            return
 
-        # basic debounce - this and allow_move should mostly handle rapid clicking
-        if self.mode == GameMode.ONE_PLAYER:
-            if self._current_player.thinking:
-                return
-            else:
-                self._current_player.move()
+        # lock input until the AI's move has been played
+        self._allow_move = False
+        self.ids.board.disabled = True
+        player = self._current_player
+        generation = self._generation
+        player.resume()
+        self._ai_move = self._ai_executor.submit(player.choose_target)
+        self._ai_move.add_done_callback(lambda future: self.ai_moved(future, player, generation))
+
+    @mainthread
+    def ai_moved(self, future, player: Player, generation: int):
+        """Plays the AI's chosen cell back on the UI thread, unless the game was reset in the meantime"""
+        if generation != self._generation or future.cancelled():
+            return
 
+        self._ai_move = None
+        try:
+            target = future.result()
+        except Exception:
+            # an exception escaping a mainthread callback would stop the event loop with input still locked
+            Logger.exception('Game: the AI failed to choose a move, playing a random one')
+            target = player.get_random_target()
         self._allow_move = True
+        self.ids.board.disabled = False
+        self.fill_cell(target, player.token)
+
+    def cancel_ai_move(self):
+        """Stops waiting on the AI's move and unlocks input"""
+        self._generation += 1
+        if self._ai_move is not None:
+            self._ai_move.cancel()
+            self._current_player.cancel()
+            self._ai_move = None
+        self._allow_move = True
+        self.ids.board.disabled = False
 
     def switch_player(self):
         """Switches the current player token between the two players"""
@@ -79,11 +162,17 @@ class Game(Screen):
 
     def reset(self):
         """Resets the grid state"""
-        for i in range(len(self.state)):
-                self.state[i] = ''
+        self.cancel_ai_move()
+        # replace the whole list so the UI gets a single change event instead of one per cell
+        self.state = [''] * len(self.state)
+        # whoever didn't make the last move starts the next game
+        self.engine.reset(self.engine.current_player)
 
     def check_end_conditions(self):
-        """Check all game end conditions"""
+        """Check all game end conditions
+
+        The engine works these out from the last move as it's played, so this only reads its result
+        """
         if self.check_win_condition():
             self.reset()
             return
@@ -94,45 +183,31 @@ class Game(Screen):
 
     def check_win_condition(self) -> bool:
         """Check all game win conditions"""
-        return self.check_rows() or self.check_cols() or self.check_diagonals()
-        pass
+        return self.engine.result in (GameResult.X_WON, GameResult.O_WON)
 
     def check_draw_condition(self) -> bool:
         """Check the draw condition"""
-        # if any of the cells have an empty space, it's not yet a draw
-        for i in range(len(self.state)):
-                if self.state[i] == '':
-                    return False
-        return True
+        return self.engine.result == GameResult.DRAW
 
     def check_rows(self) -> bool:
         """Check rows for a match"""
-        return self.check_row(0) or self.check_row(1) or self.check_row(2)
+        return any(self.check_row(x) for x in range(self.engine.rows))
 
     def check_row(self, x: int) -> bool:
         """Check row for a match"""
-        cols = self.grid_size
-        if self.state[x*self.grid_size] != '' \
-                and (self.state[x*cols] == self.state[x*cols+1] == self.state[x*cols+2]):
-            return True
-        return False
+        return self.board.has_line(self.board.layout.row_masks[x])
 
     def check_cols(self) -> bool:
         """Check columns for a match"""
-        return self.check_col(0) or self.check_col(1) or self.check_col(2)
+        return any(self.check_col(y) for y in range(self.engine.cols))
 
     def check_col(self, y: int) -> bool:
         """Check column for a match"""
-        if self.state[y] != '' and (self.state[y] == self.state[self.grid_size+y] == self.state[2*self.grid_size+y]):
-            return True
-        return False
+        return self.board.has_line(self.board.layout.col_masks[y])
 
     def check_diagonals(self) -> bool:
         """Check diagonals for a match"""
-        if self.state[0] != '' and (self.state[0] == self.state[4] == self.state[8]):
-            return True
+        return self.board.has_line(self.board.layout.diagonal_masks)
 
-        if self.state[6] != '' and (self.state[6] == self.state[4] == self.state[2]):
-            return True
 
-        return False
+metrics.track(Game, 'check_end_conditions')
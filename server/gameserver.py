@@ -0,0 +1,282 @@
+"""
+Multi-game server
+
+Runs any number of games at once over TCP, one JSON object per line each way. Every connection gets a small Session
+wrapping a GameEngine and the same AI classes the Game screen uses. Cheap AI moves are played inline, and the engines
+in POOLED_ENGINES (the search) are handed to a process pool so the event loop never waits on them. Between requests
+the game is parked in a SessionStore, so an idle connection holds a slot number rather than an engine and an AI.
+
+Requests (an "id" field is echoed back on the reply):
+
+    {"type": "new", "size": "CLASSIC", "players": 1, "difficulty": "HARD", "first": "X"}
+    {"type": "move", "cell": 4}
+    {"type": "reset"}                      new game with the same settings, started by whoever didn't move last
+    {"type": "state"}
+
+Each is answered with the game's state (or {"type": "error", "message": ...}):
+
+    {"type": "state", "cells": ["X", "", "O", ...], "turn": "X", "result": null, "ai_move": 2}
+
+In one-player games the client plays X and the AI plays O, like on the Game screen. If a pooled AI fails to answer a
+move (a worker crashed, say) the reply is an error and the client's move is taken back, so it can be sent again. A
+broken pool is replaced, and the move retried once, first.
+
+    python -m server.gameserver --host 127.0.0.1 --port 8765 --workers 4
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from constants.boardsize import BoardSize
+from constants.difficulty import Difficulty
+from constants.playertoken import PlayerToken
+from engine.gameengine import GameEngine
+from engine.sessionstore import SessionStore
+from players.ai.registry import engine_for, load_engine
+
+# engines whose moves are slow enough to be worth the trip to a worker process
+POOLED_ENGINES = {'search'}
+
+# longest request line accepted
+MAX_LINE = 4096
+
+
+def choose_move(name: str, rows: int, cols: int, win_length: int, first_player: str, moves: list) -> int:
+    """Worker job: rebuilds the game from its moves and asks the engine for the next one"""
+    engine = GameEngine(PlayerToken(first_player), rows, cols, win_length)
+    for move in moves:
+        engine.apply_move(move)
+    return load_engine(name)(engine, engine.current_player).choose_target()
+
+
+def _option(request: dict, field: str, enum, default):
+    """Reads a "new" request's setting by member name, or `default` if it's left out"""
+    name = request.get(field, default.name)
+    if not isinstance(name, str) or name not in enum.__members__:
+        raise ValueError('new needs {} to be one of {}'.format(field, ', '.join(enum.__members__)))
+    return enum[name]
+
+
+class Session:
+    """One connection's game: the engine, plus the AI playing O in one-player games
+
+    While parked, only the game's slot in the store is kept
+    """
+    __slots__ = ('engine', 'difficulty', 'ai_name', 'ai', 'slot')
+
+    def __init__(self):
+        self.engine = None
+        self.difficulty = None
+        self.ai_name = None
+        self.ai = None
+        self.slot = None
+
+    def new_game(self, size: BoardSize, players: int, difficulty: Difficulty, first_player: PlayerToken):
+        self._start(GameEngine(first_player, *size.value), difficulty if players == 1 else None)
+
+    def _start(self, engine: GameEngine, difficulty: Difficulty):
+        """Takes over the engine, with an AI of the given difficulty (None for two-player games)"""
+        self.engine = engine
+        self.difficulty = difficulty
+        self.ai_name = None
+        self.ai = None
+        if difficulty is not None:
+            self.ai_name = engine_for(difficulty, engine.board.layout)
+            if self.ai_name not in POOLED_ENGINES:
+                self.ai = load_engine(self.ai_name)(engine, PlayerToken.O)
+
+    def park(self, store: SessionStore):
+        """Packs the game into the store and lets go of the engine and the AI"""
+        if self.engine is None:
+            return
+        if self.slot is None:
+            self.slot = store.add(self.engine, self.difficulty)
+        else:
+            store.save(self.slot, self.engine, self.difficulty)
+        self.engine = None
+        self.ai = None
+
+    def unpark(self, store: SessionStore):
+        """Rebuilds the engine and the AI from the store, if the game is parked"""
+        if self.engine is None and self.slot is not None:
+            stored = store.load(self.slot)
+            self._start(stored.engine, stored.difficulty)
+
+    def close(self, store: SessionStore):
+        if self.slot is not None:
+            store.remove(self.slot)
+            self.slot = None
+
+    def ai_to_move(self) -> bool:
+        return self.ai_name is not None and self.engine.result is None \
+            and self.engine.current_player == PlayerToken.O
+
+    def to_dict(self) -> dict:
+        engine = self.engine
+        return {
+            'type': 'state',
+            'cells': list(engine.state),
+            'turn': engine.current_player.value if engine.result is None else None,
+            'result': engine.result.value if engine.result is not None else None,
+        }
+
+
+class GameServer:
+    """Accepts connections and plays each one's requests against its own Session"""
+    def __init__(self, host: str = '127.0.0.1', port: int = 8765, workers: int = None):
+        self.host = host
+        self.port = port
+        self.sessions = 0
+        self.store = SessionStore()
+        self.workers = workers
+        self._pool = self._new_pool()
+        self._server = None
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        # forked workers would inherit the open connections' sockets and keep them from closing
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+
+    async def start(self):
+        self._server = await asyncio.start_server(self.handle, self.host, self.port, limit=MAX_LINE)
+        # with port 0 the OS picks one
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self._pool.shutdown(cancel_futures=True)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serves one connection until it closes"""
+        session = Session()
+        self.sessions += 1
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # longer than MAX_LINE
+                    break
+                if not line:
+                    break
+                request = None
+                try:
+                    request = json.loads(line)
+                    reply = await self.dispatch(session, request)
+                except (ValueError, KeyError, TypeError) as error:
+                    reply = {'type': 'error', 'message': str(error)}
+                session.park(self.store)
+                if isinstance(request, dict) and 'id' in request:
+                    reply['id'] = request['id']
+                writer.write(json.dumps(reply).encode() + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            session.close(self.store)
+            self.sessions -= 1
+            writer.close()
+
+    async def dispatch(self, session: Session, request: dict) -> dict:
+        """Runs one request against the session, returning the reply"""
+        if not isinstance(request, dict):
+            raise ValueError('Request must be an object')
+        kind = request.get('type')
+        if not isinstance(kind, str):
+            raise ValueError('Request needs a string type')
+        if kind == 'new':
+            players = request.get('players', 1)
+            # bool is an int too, but true isn't a player count
+            if type(players) is not int or players not in (1, 2):
+                raise ValueError('new needs players to be 1 or 2')
+            session.new_game(_option(request, 'size', BoardSize, BoardSize.CLASSIC), players,
+                             _option(request, 'difficulty', Difficulty, Difficulty.HARD),
+                             _option(request, 'first', PlayerToken, PlayerToken.X))
+            return await self._reply(session)
+
+        session.unpark(self.store)
+        if session.engine is None:
+            raise ValueError('Start a game with "new" first')
+        if kind == 'move':
+            if session.ai_to_move():
+                raise ValueError("It is the AI's turn")
+            cell = request.get('cell')
+            if type(cell) is not int:
+                raise ValueError('move needs an integer cell')
+            session.engine.apply_move(cell)
+            return await self._reply(session, undo=True)
+        if kind == 'reset':
+            session.engine.reset(session.engine.current_player)
+            return await self._reply(session)
+        if kind == 'state':
+            return session.to_dict()
+        raise ValueError('Unknown request type: {}'.format(kind))
+
+    async def _reply(self, session: Session, undo: bool = False) -> dict:
+        """Lets the AI answer if it's up, then describes the game
+
+        If a pooled AI fails, raises ValueError, first taking the client's move back when `undo` is set
+        """
+        ai_move = None
+        if session.ai_to_move():
+            engine = session.engine
+            if session.ai is not None:
+                ai_move = session.ai.choose_target()
+            else:
+                try:
+                    ai_move = await self._pooled_move(session)
+                except Exception as error:
+                    if undo:
+                        engine.undo_move()
+                    raise ValueError('The AI failed to move: {!r}'.format(error)) from error
+            engine.apply_move(ai_move)
+
+        reply = session.to_dict()
+        reply['ai_move'] = ai_move
+        return reply
+
+    async def _pooled_move(self, session: Session) -> int:
+        """Gets the AI's move from the process pool, replacing the pool and trying again once if it's broken"""
+        engine = session.engine
+        job = (choose_move, session.ai_name, engine.rows, engine.cols, engine.win_length, engine.first_player.value,
+               list(engine.moves))
+        loop = asyncio.get_running_loop()
+        pool = self._pool
+        try:
+            return await loop.run_in_executor(pool, *job)
+        except BrokenProcessPool:
+            # another session may have replaced it already
+            if self._pool is pool:
+                pool.shutdown(wait=False)
+                self._pool = self._new_pool()
+            return await loop.run_in_executor(self._pool, *job)
+
+
+def main(args: list = None) -> int:
+    parser = argparse.ArgumentParser(description='Serves games over newline-delimited JSON on TCP')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='processes for the search AI')
+    options = parser.parse_args(args)
+
+    server = GameServer(options.host, options.port, options.workers)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
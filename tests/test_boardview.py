@@ -0,0 +1,142 @@
+import os
+
+import pytest
+
+# no window or GL context is needed to build and lay out the widget
+os.environ.setdefault('KIVY_NO_ARGS', '1')
+os.environ.setdefault('KIVY_NO_CONSOLELOG', '1')
+os.environ.setdefault('KIVY_GL_BACKEND', 'mock')
+pytest.importorskip('kivy')
+
+from kivy.clock import Clock  # noqa: E402
+from kivy.graphics import Rectangle  # noqa: E402
+from kivy.input.motionevent import MotionEvent  # noqa: E402
+
+from widgets import boardview  # noqa: E402
+from widgets.boardview import BoardView  # noqa: E402
+
+
+class _Touch(MotionEvent):
+    def __init__(self, x: float, y: float):
+        super().__init__('test', 1, (0, 0))
+        self.is_touch = True
+        self.x = self.px = x
+        self.y = self.py = y
+        self.pos = (x, y)
+
+    def depack(self, args):
+        self.sx, self.sy = args
+        super().depack(args)
+
+
+def _board(rows: int = 3, cols: int = 3, size: tuple = (300, 300)) -> BoardView:
+    board = BoardView(size=size, pos=(0, 0))
+    board.set_shape(rows, cols)
+    return board
+
+
+def _marks(board: BoardView) -> list:
+    return [position for position, mark in enumerate(board._marks) if mark is not None]
+
+
+def test_cell_at_square():
+    board = _board()
+    # row 0 is the top row
+    assert board.cell_at(50, 250) == 0
+    assert board.cell_at(250, 250) == 2
+    assert board.cell_at(150, 150) == 4
+    assert board.cell_at(250, 50) == 8
+    assert board.cell_at(-1, 150) == -1
+    assert board.cell_at(150, 301) == -1
+
+
+def test_cell_at_centers_the_board():
+    # 100px cells, with 50px to spare either side
+    board = _board(3, 3, (400, 300))
+    assert board.cell_at(40, 150) == -1
+    assert board.cell_at(60, 150) == 3
+    assert board.cell_at(340, 150) == 5
+    assert board.cell_at(360, 150) == -1
+
+
+def test_cell_at_large_board():
+    board = _board(15, 15, (600, 600))
+    assert board.cell_at(1, 599) == 0
+    assert board.cell_at(599, 1) == 224
+    assert board.cell_at(300, 300) == 7 * 15 + 7
+
+
+def test_show_only_draws_changed_cells():
+    board = _board()
+    drawn = []
+    draw_cell = board._draw_cell
+    board._draw_cell = lambda position, token: drawn.append(position) or draw_cell(position, token)
+
+    board.show(['X', '', '', '', '', '', '', '', ''])
+    board.show(['X', '', '', '', 'O', '', '', '', ''])
+    assert drawn == [0, 4]
+    assert _marks(board) == [0, 4]
+    assert len([child for child in board._mark_group.children if isinstance(child, Rectangle)]) == 2
+
+    # a new game drops every mark at once
+    board.show([''] * 9)
+    assert drawn == [0, 4]
+    assert _marks(board) == []
+    assert not board._mark_group.children
+
+
+def test_glyphs_share_one_atlas():
+    # a widget's canvas sets up the graphics context the textures need
+    _board()
+    glyphs = boardview.get_glyphs(40)
+    assert set(glyphs) == {'X', 'O'}
+    assert glyphs['X'].width > 0 and glyphs['O'].width > 0
+    # side by side in one texture, both flipped the right way up
+    assert glyphs['X'].uvpos[0] == 0
+    assert glyphs['O'].uvpos[0] == pytest.approx(glyphs['X'].uvsize[0])
+    assert glyphs['X'].uvsize[1] < 0 and glyphs['O'].uvsize[1] < 0
+    assert boardview.get_glyphs(40) is glyphs
+
+
+def test_set_shape_lays_out_once(monkeypatch):
+    calls = []
+    original = BoardView._layout
+
+    # the trigger looks its callback up by name
+    def _layout(self, *args):
+        calls.append(args)
+        original(self, *args)
+    monkeypatch.setattr(BoardView, '_layout', _layout)
+    board = _board()
+    Clock.tick()
+    calls.clear()
+
+    board.set_shape(15, 15)
+    Clock.tick()
+    assert len(calls) == 1
+    assert board.cells == 225 and len(board._marks) == 225
+    # a resize changes pos and size, but lays out once on the next frame
+    board.pos = (10, 10)
+    board.size = (450, 450)
+    Clock.tick()
+    assert len(calls) == 2
+    assert board._cell_size == 30
+
+
+def test_touch_fires_cell_events():
+    board = _board()
+    events = []
+    board.bind(on_cell_press=lambda board, position: events.append(('press', position)),
+               on_cell_release=lambda board, position: events.append(('release', position)))
+
+    touch = _Touch(250, 250)
+    assert board.on_touch_down(touch)
+    touch.grab_current = board
+    assert board.on_touch_up(touch)
+    assert events == [('press', 2), ('release', 2)]
+
+    # taken cells don't respond
+    board.show(['', '', 'X', '', '', '', '', '', ''])
+    touch = _Touch(250, 250)
+    board.on_touch_down(touch)
+    assert events == [('press', 2), ('release', 2)]
@@ -0,0 +1,39 @@
+import random
+
+import pytest
+
+from constants.gameresult import GameResult
+from constants.playertoken import PlayerToken
+from engine.gameengine import GameEngine, play
+from engine.gamerecord import (MAX_CELLS, NIBBLE_CELLS, GameRecordReader, GameRecordWriter, decode_game,
+                               encode_game)
+from players.ai.easy import EasyAI
+
+
+@pytest.mark.parametrize('cells', [1, 9, NIBBLE_CELLS - 1, NIBBLE_CELLS, NIBBLE_CELLS + 1, 17, 64, MAX_CELLS])
+@pytest.mark.parametrize('played', ['none', 'one', 'odd', 'even', 'full'])
+def test_encode_decode_round_trip(cells, played):
+    count = {'none': 0, 'one': 1, 'odd': cells - 1 | 1, 'even': cells & ~1, 'full': cells}[played]
+    moves = random.Random(cells).sample(range(cells), min(count, cells))
+    for first_player in PlayerToken:
+        for result in GameResult:
+            raw = encode_game(first_player, result, moves, cells)
+            assert decode_game(raw, cells) == (first_player, result, moves)
+
+
+def test_writer_reader_round_trip(tmp_path):
+    path = str(tmp_path / 'games.bin')
+    writer = GameRecordWriter(path, chunk_size=32)
+    games = []
+    for rows, cols, win_length in [(3, 3, 3), (4, 4, 3), (4, 4, 4), (5, 5, 4)]:
+        for _ in range(20):
+            engine = GameEngine(random.choice(list(PlayerToken)), rows, cols, win_length)
+            engine.recorder = writer
+            play(engine, EasyAI(engine, PlayerToken.X), EasyAI(engine, PlayerToken.O))
+            games.append((rows, cols, win_length, engine.first_player, engine.result, list(engine.moves)))
+    writer.close()
+
+    reader = GameRecordReader(path)
+    assert [tuple(game) for game in reader] == games
+    assert reader.verify() == (len(games), 0)
+
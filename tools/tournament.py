@@ -0,0 +1,198 @@
+"""
+AI tournament runner
+
+Plays every AI against every other AI (and itself) as both X and O on the headless engine, spreading the games over
+a process pool. Each job seeds its own RNG from the tournament seed, so a run is reproducible for a given seed,
+game count and chunk size. The per-matchup result tables and per-move latency stats are merged at the end.
+
+    python -m tools.tournament --games 10000 --workers 8 --json results.json
+
+Exits with a non-zero status if an engine listed with --unbeatable lost a game.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from constants.gameresult import GameResult
+from constants.playertoken import PlayerToken
+from engine.gameengine import GameEngine
+from players.ai.registry import ENGINES, load_engine
+
+# latency histogram buckets are powers of two in microseconds, up to ~1 minute
+_BUCKETS = 27
+
+
+class LatencyStats:
+    """Mergeable per-move latency summary"""
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * _BUCKETS
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.buckets[min(int(seconds * 1e6).bit_length(), _BUCKETS - 1)] += 1
+
+    def merge(self, other: 'LatencyStats'):
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+
+    def percentile(self, fraction: float) -> float:
+        """Upper bound of the bucket holding the given fraction of moves, in seconds"""
+        threshold = fraction * self.count
+        seen = 0
+        for bucket, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= threshold:
+                return (1 << bucket) / 1e6
+        return 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            'moves': self.count,
+            'mean_us': self.total / self.count * 1e6 if self.count else 0.0,
+            'p50_us': self.percentile(0.5) * 1e6,
+            'p99_us': self.percentile(0.99) * 1e6,
+            'max_us': self.max * 1e6,
+        }
+
+
+class MatchupResult:
+    """Mergeable outcome of the games between one X engine and one O engine"""
+    def __init__(self, x: str, o: str):
+        self.x = x
+        self.o = o
+        self.x_wins = 0
+        self.o_wins = 0
+        self.draws = 0
+        self.x_latency = LatencyStats()
+        self.o_latency = LatencyStats()
+
+    @property
+    def games(self) -> int:
+        return self.x_wins + self.o_wins + self.draws
+
+    def losses(self, name: str) -> int:
+        """Games the given engine lost in this matchup"""
+        return (self.o_wins if self.x == name else 0) + (self.x_wins if self.o == name else 0)
+
+    def merge(self, other: 'MatchupResult'):
+        self.x_wins += other.x_wins
+        self.o_wins += other.o_wins
+        self.draws += other.draws
+        self.x_latency.merge(other.x_latency)
+        self.o_latency.merge(other.o_latency)
+
+    def to_dict(self) -> dict:
+        return {
+            'x': self.x,
+            'o': self.o,
+            'games': self.games,
+            'x_wins': self.x_wins,
+            'o_wins': self.o_wins,
+            'draws': self.draws,
+            'x_latency': self.x_latency.to_dict(),
+            'o_latency': self.o_latency.to_dict(),
+        }
+
+
+def play_games(x: str, o: str, games: int, seed: int) -> MatchupResult:
+    """Worker job: plays a chunk of games for one matchup with its own seeded RNG"""
+    # the AIs use the module-level random functions, so seeding it gives every job its own stream
+    random.seed(seed)
+    result = MatchupResult(x, o)
+    engine = GameEngine()
+    x_player = load_engine(x)(engine, PlayerToken.X)
+    o_player = load_engine(o)(engine, PlayerToken.O)
+    turns = {PlayerToken.X: (x_player, result.x_latency), PlayerToken.O: (o_player, result.o_latency)}
+    clock = time.perf_counter
+
+    for _ in range(games):
+        engine.reset()
+        while engine.result is None:
+            player, latency = turns[engine.current_player]
+            started = clock()
+            player.move()
+            latency.add(clock() - started)
+
+        if engine.result == GameResult.X_WON:
+            result.x_wins += 1
+        elif engine.result == GameResult.O_WON:
+            result.o_wins += 1
+        else:
+            result.draws += 1
+
+    return result
+
+
+def run(engines: list, games: int, workers: int = None, chunk: int = 1000, seed: int = 0) -> list:
+    """Plays `games` games for every ordered pair of engines, returning the merged MatchupResults"""
+    matchups = {(x, o): MatchupResult(x, o) for x in engines for o in engines}
+    jobs = []
+    for x, o in matchups:
+        for start in range(0, games, chunk):
+            jobs.append((x, o, min(chunk, games - start)))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(play_games, x, o, count, seed * 1000003 + job)
+                   for job, (x, o, count) in enumerate(jobs)]
+        for future in futures:
+            partial = future.result()
+            matchups[(partial.x, partial.o)].merge(partial)
+
+    return list(matchups.values())
+
+
+def print_report(results: list):
+    print('{:>8} {:>8} {:>9} {:>9} {:>9} {:>11} {:>11}'.format(
+        'X', 'O', 'X wins', 'O wins', 'draws', 'X p99 (us)', 'O p99 (us)'))
+    for result in results:
+        print('{:>8} {:>8} {:>9} {:>9} {:>9} {:>11.0f} {:>11.0f}'.format(
+            result.x, result.o, result.x_wins, result.o_wins, result.draws,
+            result.x_latency.percentile(0.99) * 1e6, result.o_latency.percentile(0.99) * 1e6))
+
+
+def main(args: list = None) -> int:
+    parser = argparse.ArgumentParser(description='Plays every AI against every other AI as both X and O')
+    # MCTS spends its whole playout budget on every move, even on 3x3, so it's only played when asked for
+    parser.add_argument('--engines', nargs='+', choices=sorted(ENGINES),
+                        default=[name for name in ENGINES if name != 'mcts'])
+    parser.add_argument('--games', type=int, default=1000, help='games per matchup')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--chunk', type=int, default=1000, help='games per worker job')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='write the merged results to this file')
+    parser.add_argument('--unbeatable', nargs='*', default=['hard'], help='engines that must never lose')
+    options = parser.parse_args(args)
+
+    started = time.perf_counter()
+    results = run(options.engines, options.games, options.workers, options.chunk, options.seed)
+    elapsed = time.perf_counter() - started
+    print_report(results)
+    print('{} games in {:.1f}s'.format(sum(result.games for result in results), elapsed))
+
+    if options.json:
+        with open(options.json, 'w') as file:
+            json.dump({'seed': options.seed, 'elapsed': elapsed,
+                       'matchups': [result.to_dict() for result in results]}, file, indent=2)
+
+    failed = False
+    for name in options.unbeatable:
+        losses = sum(result.losses(name) for result in results)
+        if losses:
+            print('{} lost {} games'.format(name, losses))
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,171 @@
+"""
+Exhaustive check that HardAI never loses
+
+Walks the whole 3x3 game tree with HardAI as X and as O: every legal reply of the opponent, and every move HardAI
+can make at each of its turns. HardAI's random calls (its opening book picks, ties in the solved table and the
+random fallback) are replaced by a script that's replayed with every possible choice, so each branch it could take
+is visited. HardAI keeps no state between moves, so positions are only expanded once.
+
+Each opening (HardAI's possible first moves as X, the opponent's first moves against it as O) is checked by a
+separate job on a process pool, and the results are merged per opening.
+
+    python -m tools.verifyhard [--workers 4]
+
+Prints every losing line found and exits with a non-zero status if there is one.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from constants.playertoken import PlayerToken
+from engine.gameengine import GameEngine
+from players.ai.hard import HardAI
+
+
+class _Branches:
+    """Stands in for the random module, making each call return the choice the current script asks for
+
+    After every run, advance() moves the script on to the next combination of choices, like an odometer, until
+    every combination has been used
+    """
+    def __init__(self):
+        self._script = []
+        self._sizes = []
+        self._call = 0
+
+    def _pick(self, options: int) -> int:
+        if self._call == len(self._script):
+            self._script.append(0)
+            self._sizes.append(options)
+        choice = self._script[self._call]
+        self._call += 1
+        return choice
+
+    def choice(self, sequence):
+        return sequence[self._pick(len(sequence))]
+
+    def randrange(self, stop: int) -> int:
+        return self._pick(stop)
+
+    def advance(self) -> bool:
+        """Moves on to the next combination, returning False once they've all been tried"""
+        self._call = 0
+        while self._script:
+            if self._script[-1] + 1 < self._sizes[-1]:
+                self._script[-1] += 1
+                return True
+            self._script.pop()
+            self._sizes.pop()
+        return False
+
+
+def hard_moves(ai: HardAI) -> list:
+    """Gets every move HardAI could pick in the current position, whatever its random calls return"""
+    branches = _Branches()
+    originals = random.choice, random.randrange
+    random.choice, random.randrange = branches.choice, branches.randrange
+    try:
+        moves = set()
+        while True:
+            moves.add(ai.choose_target())
+            if not branches.advance():
+                return sorted(moves)
+    finally:
+        random.choice, random.randrange = originals
+
+
+class OpeningResult:
+    """What was found below one opening"""
+    def __init__(self, hard_token: PlayerToken, opening: list):
+        self.hard_token = hard_token
+        self.opening = opening
+        self.positions = 0
+        self.hard_choices = 0
+        self.losing_lines = []
+
+
+def verify_opening(hard_token: PlayerToken, opening: list) -> OpeningResult:
+    """Worker job: explores every game that starts with the given moves (X moves first)"""
+    result = OpeningResult(hard_token, opening)
+    engine = GameEngine()
+    board = engine.board
+    ai = HardAI(engine, hard_token)
+    opponent = PlayerToken.O if hard_token == PlayerToken.X else PlayerToken.X
+    safe_positions = {}
+
+    def explore(token: PlayerToken, line: list) -> bool:
+        """Checks HardAI can't lose from here, with the token to move"""
+        key = (board.mask(PlayerToken.X), board.mask(PlayerToken.O))
+        if key in safe_positions:
+            return safe_positions[key]
+        result.positions += 1
+
+        safe = True
+        if token == hard_token:
+            moves = hard_moves(ai)
+            result.hard_choices += len(moves)
+        else:
+            moves = sorted(board.free_cells())
+        for move in moves:
+            won = board.place(move, token)
+            if won and token == opponent:
+                result.losing_lines.append(line + [move])
+                safe = False
+            elif not won and not board.is_full():
+                safe = explore(opponent if token == hard_token else hard_token, line + [move]) and safe
+            board.remove(move, token)
+
+        safe_positions[key] = safe
+        return safe
+
+    token = PlayerToken.X
+    for move in opening:
+        board.place(move, token)
+        token = PlayerToken.O if token == PlayerToken.X else PlayerToken.X
+    explore(token, list(opening))
+    return result
+
+
+def openings() -> list:
+    """Gets the (HardAI's token, first move) jobs covering the whole tree"""
+    engine = GameEngine()
+    jobs = [(PlayerToken.X, [move]) for move in hard_moves(HardAI(engine, PlayerToken.X))]
+    jobs += [(PlayerToken.O, [move]) for move in range(engine.board.cells)]
+    return jobs
+
+
+def run(workers: int = None) -> list:
+    """Verifies every opening on a process pool, returning the OpeningResults"""
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(verify_opening, token, opening) for token, opening in openings()]
+        return [future.result() for future in futures]
+
+
+def main(args: list = None) -> int:
+    parser = argparse.ArgumentParser(description='Checks HardAI cannot lose from any line of play')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    options = parser.parse_args(args)
+
+    started = time.perf_counter()
+    results = run(options.workers)
+    elapsed = time.perf_counter() - started
+
+    print('{:>6} {:>8} {:>10} {:>13} {:>8}'.format('HardAI', 'opening', 'positions', 'HardAI moves', 'losses'))
+    losing_lines = []
+    for result in results:
+        print('{:>6} {:>8} {:>10} {:>13} {:>8}'.format(
+            result.hard_token.value, ','.join(map(str, result.opening)), result.positions, result.hard_choices,
+            len(result.losing_lines)))
+        losing_lines += [(result.hard_token, line) for line in result.losing_lines]
+    print('{} positions checked in {:.2f}s'.format(sum(result.positions for result in results), elapsed))
+
+    for token, line in losing_lines:
+        print('HardAI as {} loses: {}'.format(token.value, ' '.join(map(str, line))))
+    return 1 if losing_lines else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
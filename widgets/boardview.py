@@ -0,0 +1,206 @@
+"""
+Canvas-drawn game board
+
+Draws the grid and the marks straight onto the canvas instead of using a Button per cell, so a move costs one
+instruction added or removed whatever the board size, and nothing gets laid out. The X and O glyphs are rendered once
+per pixel size into a shared texture atlas, and each mark is a Rectangle showing its glyph's region of the atlas.
+show() only touches the cells whose token changed since the last call.
+"""
+from kivy.clock import Clock
+from kivy.core.text import Label as CoreLabel
+from kivy.graphics import Color, InstructionGroup, Line, Rectangle
+from kivy.graphics.texture import Texture
+from kivy.properties import ListProperty, NumericProperty
+from kivy.uix.widget import Widget
+
+from constants.playertoken import PlayerToken
+
+# glyph size as a fraction of the cell size
+GLYPH_SCALE = 0.7
+
+# glyph pixel size -> {token value: region of that size's atlas}, shared by every board
+_atlases = {}
+
+# atlases kept before the cache starts over (every window size a board is drawn at needs its own)
+MAX_ATLASES = 8
+
+
+def get_glyphs(size: int) -> dict:
+    """Gets the X and O glyphs rendered at the given font size, building their atlas the first time"""
+    glyphs = _atlases.get(size)
+    if glyphs is None:
+        textures = []
+        for token in PlayerToken:
+            label = CoreLabel(text=token.value, font_size=size)
+            label.refresh()
+            textures.append((token.value, label.texture))
+
+        atlas = Texture.create(size=(sum(texture.width for _, texture in textures),
+                                     max(texture.height for _, texture in textures)), colorfmt='rgba')
+        glyphs = {}
+        x = 0
+        for value, texture in textures:
+            atlas.blit_buffer(texture.pixels, pos=(x, 0), size=texture.size, colorfmt='rgba', bufferfmt='ubyte')
+            region = atlas.get_region(x, 0, texture.width, texture.height)
+            # label textures are stored upside down, same as the pixels copied out of them
+            region.flip_vertical()
+            glyphs[value] = region
+            x += texture.width
+        if len(_atlases) >= MAX_ATLASES:
+            _atlases.clear()
+        _atlases[size] = glyphs
+    return glyphs
+
+
+class BoardView(Widget):
+    """A rows x cols board drawn with canvas instructions
+
+    Fires on_cell_press and on_cell_release with the cell's position when a free cell is touched
+    """
+    rows = NumericProperty(3)
+    cols = NumericProperty(3)
+    line_color = ListProperty([1, 1, 1, 1])
+    line_width = NumericProperty(2)
+    mark_color = ListProperty([1, 1, 1, 1])
+
+    __events__ = ('on_cell_press', 'on_cell_release')
+
+    def __init__(self, **kwargs):
+        # token value each cell is showing, and the Rectangle drawing it (None for empty cells)
+        self._shown = []
+        self._marks = []
+        self._pressed = -1
+        self._cell_size = 0
+        self._origin = (0, 0)
+        self._glyphs = None
+        super(BoardView, self).__init__(**kwargs)
+
+        self._line_color = Color(*self.line_color)
+        self._lines = InstructionGroup()
+        self.canvas.before.add(self._line_color)
+        self.canvas.before.add(self._lines)
+        self._mark_color = Color(*self.mark_color)
+        self._mark_group = InstructionGroup()
+        self.canvas.add(self._mark_color)
+        self.canvas.add(self._mark_group)
+
+        # a resize changes pos and size, and a new shape rows and cols, so the layout waits for the next frame to
+        # be done once
+        self._trigger_layout = Clock.create_trigger(self._layout, -1)
+        self.bind(pos=self._trigger_layout, size=self._trigger_layout, rows=self._trigger_layout,
+                  cols=self._trigger_layout, line_width=self._trigger_layout)
+        self.bind(line_color=lambda instance, value: setattr(self._line_color, 'rgba', value),
+                  mark_color=lambda instance, value: setattr(self._mark_color, 'rgba', value))
+        self.set_shape(self.rows, self.cols)
+
+    @property
+    def cells(self) -> int:
+        return int(self.rows * self.cols)
+
+    def set_shape(self, rows: int, cols: int):
+        """Switches to a board of the given size, with every cell empty, laying it out once right away"""
+        self._shown = [''] * (rows * cols)
+        self._pressed = -1
+        self.rows = rows
+        self.cols = cols
+        self._trigger_layout.cancel()
+        self._layout()
+
+    def show(self, state: list):
+        """Draws the given tokens (one per cell, '' for empty), redrawing only the cells that changed"""
+        shown = self._shown
+        if not any(state) and any(shown):
+            # a new game: drop every mark at once
+            self._mark_group.clear()
+            self._shown = [''] * len(shown)
+            self._marks = [None] * len(shown)
+            return
+        for position, token in enumerate(state):
+            if shown[position] != token:
+                self._draw_cell(position, token)
+
+    def cell_at(self, x: float, y: float) -> int:
+        """Gets the cell under the given window coordinates, or -1 if it's outside the board"""
+        if not self._cell_size:
+            return -1
+        col = int((x - self._origin[0]) // self._cell_size)
+        row = self.rows - 1 - int((y - self._origin[1]) // self._cell_size)
+        if not 0 <= row < self.rows or not 0 <= col < self.cols:
+            return -1
+        return int(row * self.cols + col)
+
+    def _cell_pos(self, position: int) -> tuple:
+        """Gets the bottom-left corner of the cell (row 0 is the top row)"""
+        row, col = divmod(position, int(self.cols))
+        return (self._origin[0] + col * self._cell_size,
+                self._origin[1] + (self.rows - 1 - row) * self._cell_size)
+
+    def _draw_cell(self, position: int, token: str):
+        mark = self._marks[position]
+        if mark is not None:
+            self._mark_group.remove(mark)
+            mark = None
+        if token and self._glyphs is not None:
+            glyph = self._glyphs[token]
+            x, y = self._cell_pos(position)
+            offset_x = (self._cell_size - glyph.width) / 2
+            offset_y = (self._cell_size - glyph.height) / 2
+            mark = Rectangle(texture=glyph, pos=(x + offset_x, y + offset_y), size=glyph.size)
+            self._mark_group.add(mark)
+        self._marks[position] = mark
+        self._shown[position] = token
+
+    def _layout(self, *args):
+        """Fits the board to the widget, redrawing the grid and every mark (only on resize or a new board size)"""
+        rows, cols = int(self.rows), int(self.cols)
+        if len(self._shown) != rows * cols:
+            # a new board size, so nothing is on it yet
+            self._shown = [''] * (rows * cols)
+        self._cell_size = min(self.width / cols, self.height / rows)
+        self._origin = (self.x + (self.width - self._cell_size * cols) / 2,
+                        self.y + (self.height - self._cell_size * rows) / 2)
+        left, bottom = self._origin
+        right = left + self._cell_size * cols
+        top = bottom + self._cell_size * rows
+
+        self._lines.clear()
+        for col in range(1, cols):
+            x = left + col * self._cell_size
+            self._lines.add(Line(points=[x, bottom, x, top], width=self.line_width))
+        for row in range(1, rows):
+            y = bottom + row * self._cell_size
+            self._lines.add(Line(points=[left, y, right, y], width=self.line_width))
+
+        glyph_size = int(self._cell_size * GLYPH_SCALE)
+        self._glyphs = get_glyphs(glyph_size) if glyph_size > 0 else None
+        shown = self._shown
+        self._mark_group.clear()
+        self._shown = [''] * len(shown)
+        self._marks = [None] * len(shown)
+        self.show(shown)
+
+    def on_touch_down(self, touch):
+        if self.disabled or not self.collide_point(*touch.pos):
+            return super(BoardView, self).on_touch_down(touch)
+        position = self.cell_at(*touch.pos)
+        if position != -1 and not self._shown[position]:
+            touch.grab(self)
+            self._pressed = position
+            self.dispatch('on_cell_press', position)
+        return True
+
+    def on_touch_up(self, touch):
+        if touch.grab_current is not self:
+            return super(BoardView, self).on_touch_up(touch)
+        touch.ungrab(self)
+        position = self._pressed
+        self._pressed = -1
+        if position != -1:
+            self.dispatch('on_cell_release', position)
+        return True
+
+    def on_cell_press(self, position: int):
+        pass
+
+    def on_cell_release(self, position: int):
+        pass